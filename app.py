@@ -42,6 +42,36 @@ app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
 app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
 app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER', 'noreply@subscriptiontracker.com')
 
+# Reminder emails are rendered outside of a request, so links in them are
+# built from these settings (e.g. SERVER_NAME=subscriptions.example.com)
+app.config['SERVER_NAME'] = os.environ.get('SERVER_NAME') or None
+app.config['APPLICATION_ROOT'] = os.environ.get('APPLICATION_ROOT', '/')
+app.config['PREFERRED_URL_SCHEME'] = os.environ.get('PREFERRED_URL_SCHEME', 'https')
+
+# Configure exchange rate API
+app.config['EXCHANGE_RATE_API_URL'] = os.environ.get('EXCHANGE_RATE_API_URL', 'https://open.er-api.com/v6/latest/')
+app.config['EXCHANGE_RATE_BASE_CURRENCY'] = os.environ.get('EXCHANGE_RATE_BASE_CURRENCY', 'USD')
+app.config['SUPPORTED_CURRENCIES'] = os.environ.get('SUPPORTED_CURRENCIES', 'USD,EUR,CZK,PLN').split(',')
+
+# Set to false when the scheduler runs as its own process (python scheduler.py)
+app.config['RUN_SCHEDULER'] = os.environ.get('RUN_SCHEDULER', 'true').lower() == 'true'
+
+# Uploaded CSV files wait here until their background import has finished.
+# Must be on a disk shared by all workers.
+app.config['IMPORT_FOLDER'] = os.environ.get('IMPORT_FOLDER', os.path.join(app.instance_path, 'imports'))
+
+# Uploaded logo images wait here until they have been resized and converted
+app.config['LOGO_UPLOAD_FOLDER'] = os.environ.get('LOGO_UPLOAD_FOLDER', os.path.join(app.instance_path, 'logo_uploads'))
+
+# Remote logos fetched by the /logo proxy are normalized and cached here.
+# Private and loopback addresses are only fetched if explicitly allowed.
+app.config['LOGO_CACHE_FOLDER'] = os.environ.get('LOGO_CACHE_FOLDER', os.path.join(app.instance_path, 'logo_cache'))
+app.config['LOGO_PROXY_ALLOW_PRIVATE'] = os.environ.get('LOGO_PROXY_ALLOW_PRIVATE', 'false').lower() == 'true'
+
+# Set to false for a fast start once the schema is managed with `flask db upgrade`:
+# create_all() inspects every table on each worker boot
+app.config['CREATE_TABLES_ON_STARTUP'] = os.environ.get('CREATE_TABLES_ON_STARTUP', 'true').lower() == 'true'
+
 # Initialize extensions with app
 db.init_app(app)
 login_manager.init_app(app)
@@ -54,11 +84,14 @@ with app.app_context():
     import models
     
     # Create all tables
-    db.create_all()
+    if app.config['CREATE_TABLES_ON_STARTUP']:
+        db.create_all()
     
     # Import routes
     import routes
     
-    # Setup scheduler for reminders and currency updates
-    from scheduler import init_scheduler
-    init_scheduler()
+    # Setup scheduler for reminders and currency updates.
+    # Only one process at a time runs the jobs, see scheduler.py.
+    if app.config['RUN_SCHEDULER']:
+        from scheduler import init_scheduler
+        init_scheduler()
@@ -0,0 +1,74 @@
+"""
+Benchmark logo matching over generated subscription names.
+
+Usage: python benchmark_logo_catalog.py [count]
+
+Compares the compiled logo catalog with the linear substring scan it
+replaced, and checks every catalog result against a brute-force longest
+match so the speed-up can't come from wrong answers.
+"""
+import random
+import sys
+import time
+from logo_catalog import SERVICE_LOGOS, catalog, normalize_name
+
+WORDS = ['family', 'plan', 'premium', 'pro', 'team', 'basic', 'annual', 'student', 'plus', 'my', 'work']
+
+def generate_names(count, seed=42):
+    """Mix known service names with filler words and unknown services."""
+    rng = random.Random(seed)
+    services = list(SERVICE_LOGOS)
+    names = []
+    for _ in range(count):
+        parts = rng.sample(WORDS, rng.randint(0, 3))
+        if rng.random() < 0.7:
+            parts.insert(rng.randint(0, len(parts)), rng.choice(services).title())
+        else:
+            parts.insert(0, ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(8)))
+        names.append(' '.join(parts))
+    return names
+
+def linear_scan(name):
+    """The previous matcher: first table entry contained in the name wins."""
+    name_lower = name.lower()
+    for known_service, logo in SERVICE_LOGOS.items():
+        if known_service in name_lower:
+            return logo
+    return None
+
+def brute_force_longest(name):
+    """Reference matcher: longest contained key, earliest position on ties."""
+    name = normalize_name(name)
+    best = None
+    for key, logo in SERVICE_LOGOS.items():
+        position = name.find(key)
+        if position >= 0:
+            candidate = (-len(key), position + len(key), logo)
+            if best is None or candidate < best:
+                best = candidate
+    return best[2] if best else None
+
+def timed(matcher, names):
+    started = time.perf_counter()
+    results = [matcher(name) for name in names]
+    return results, time.perf_counter() - started
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    names = generate_names(count)
+
+    catalog_results, catalog_seconds = timed(catalog.match_name, names)
+    _, linear_seconds = timed(linear_scan, names)
+
+    mismatches = [
+        name for name, result in zip(names, catalog_results)
+        if result != brute_force_longest(name)
+    ]
+
+    print(f"{count} names")
+    print(f"  linear scan: {linear_seconds * 1000:.0f} ms ({linear_seconds / count * 1e6:.2f} us/name)")
+    print(f"  catalog:     {catalog_seconds * 1000:.0f} ms ({catalog_seconds / count * 1e6:.2f} us/name)")
+    print(f"  differences from brute-force longest match: {len(mismatches)}")
+    if mismatches:
+        print(f"  e.g. {mismatches[:5]}")
+        sys.exit(1)
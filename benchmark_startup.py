@@ -0,0 +1,61 @@
+"""
+Measure how long a fresh process takes to import the app and serve its first request.
+
+Usage: python benchmark_startup.py [runs]
+
+Each run starts a new Python process, so nothing is cached between runs.
+Both the default startup and the fast start (CREATE_TABLES_ON_STARTUP=false)
+are measured against the database in DATABASE_URL. The scheduler is not
+started, since it never blocks startup.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Code run in each child process; prints its timings as JSON
+CHILD_SCRIPT = """
+import json, time
+started = time.perf_counter()
+from app import app
+imported = time.perf_counter()
+response = app.test_client().get('/login')
+served = time.perf_counter()
+print(json.dumps({
+    'status': response.status_code,
+    'import': imported - started,
+    'first_request': served - started,
+}))
+"""
+
+MODES = {
+    'default': {'CREATE_TABLES_ON_STARTUP': 'true'},
+    'fast start': {'CREATE_TABLES_ON_STARTUP': 'false'},
+}
+
+def run_once(extra_env):
+    """Start one fresh process and return its timings."""
+    env = {**os.environ, 'RUN_SCHEDULER': 'false', **extra_env}
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    for mode, extra_env in MODES.items():
+        timings = [run_once(extra_env) for _ in range(runs)]
+        import_median = statistics.median(t['import'] for t in timings) * 1000
+        first_request_median = statistics.median(t['first_request'] for t in timings) * 1000
+        print(
+            f"{mode:>10}: import {import_median:.0f} ms, "
+            f"time to first request {first_request_median:.0f} ms "
+            f"(median of {runs} runs, status {timings[-1]['status']})"
+        )
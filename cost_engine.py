@@ -0,0 +1,190 @@
+"""
+Vectorized subscription cost engine.
+
+Normalizes subscription amounts to monthly and yearly costs in the user's
+preferred currency. The dashboard, reports and the spending API all use it,
+so the billing cycle rules live in one place.
+"""
+import numpy as np
+import pandas as pd
+from sqlalchemy import func
+from app import db
+from models import Subscription
+from recurrence import payment_dates
+from utils import convert_currency, convert_currency_at, get_rates_as_of
+
+# Billing cycles in the order used for cycle codes and charts
+BILLING_CYCLES = ['weekly', 'monthly', 'quarterly', 'bi-annually', 'yearly', 'lifetime']
+
+# Multipliers that turn one payment into a monthly or yearly cost.
+# The trailing zero is picked up by unknown cycles (code -1).
+MONTHLY_FACTORS = np.array([4.33, 1.0, 1 / 3, 1 / 6, 1 / 12, 0.0, 0.0])  # 4.33 = average weeks in a month
+YEARLY_FACTORS = np.array([52.0, 12.0, 4.0, 2.0, 1.0, 0.0, 0.0])
+
+def subscription_columns(subscriptions):
+    """Split a list of subscriptions into the columnar arrays used by compute_costs."""
+    return (
+        [sub.amount for sub in subscriptions],
+        [sub.currency for sub in subscriptions],
+        [sub.billing_cycle for sub in subscriptions],
+        [bool(sub.is_active) for sub in subscriptions],
+    )
+
+def load_grouped_columns(user_id):
+    """
+    Aggregate a user's subscriptions in the database instead of in Python.
+
+    Returns the columns expected by compute_costs plus a `counts` column,
+    with one row per (currency, billing_cycle, is_active) group and the
+    amounts summed. The result has at most a few dozen rows no matter
+    how many subscriptions the user has.
+    """
+    frame = pd.DataFrame(
+        db.session.query(
+            func.coalesce(func.sum(Subscription.amount), 0.0),
+            Subscription.currency,
+            Subscription.billing_cycle,
+            Subscription.is_active,
+            func.count(Subscription.id)
+        ).filter(
+            Subscription.user_id == user_id
+        ).group_by(
+            Subscription.user_id,
+            Subscription.currency,
+            Subscription.billing_cycle,
+            Subscription.is_active
+        ).all(),
+        columns=['amount', 'currency', 'billing_cycle', 'is_active', 'count']
+    )
+
+    return (
+        frame['amount'].to_numpy(dtype=float),
+        frame['currency'].to_numpy(),
+        frame['billing_cycle'].to_numpy(),
+        frame['is_active'].fillna(False).to_numpy(dtype=bool),
+        frame['count'].to_numpy(dtype=int),
+    )
+
+def compute_grouped_costs(user_id, target_currency, rate_date=None):
+    """Compute aggregate costs for a user from the database-side GROUP BY."""
+    amounts, currencies, billing_cycles, is_active, counts = load_grouped_columns(user_id)
+    return compute_costs(
+        amounts, currencies, billing_cycles, is_active, target_currency,
+        counts=counts, rate_date=rate_date
+    )
+
+def compute_costs(amounts, currencies, billing_cycles, is_active, target_currency,
+                  counts=None, rate_date=None):
+    """
+    Compute per-row and aggregate costs for a set of subscriptions.
+
+    All inputs are parallel arrays. `counts` gives the number of subscriptions
+    each row stands for, so pre-aggregated rows (summed amounts) can be passed
+    in as well; it defaults to one subscription per row. With `rate_date`
+    amounts are converted at the exchange rates in effect on that day
+    instead of the current ones.
+
+    Returns a dict with per-row `amount_in_preferred`, `monthly_cost` and
+    `yearly_cost` arrays plus totals, `spending_by_cycle`,
+    `spending_by_currency` and `cycle_counts` for active subscriptions.
+    """
+    amounts = np.nan_to_num(np.asarray(amounts, dtype=float))
+    active = np.asarray(is_active, dtype=bool)
+    if counts is None:
+        counts = np.ones(len(amounts), dtype=int)
+    else:
+        counts = np.asarray(counts, dtype=int)
+
+    # Look up each distinct currency once, then broadcast the rates to the rows.
+    # A missing currency is treated as already being in the target currency.
+    currency_codes, currency_names = pd.factorize(
+        pd.Series(currencies, dtype=object).fillna(target_currency)
+    )
+    if rate_date is None:
+        rates = [convert_currency(1.0, currency, target_currency) for currency in currency_names]
+    else:
+        rates = [
+            convert_currency_at(1.0, currency, target_currency, rate_date)
+            for currency in currency_names
+        ]
+    rates = np.array(rates, dtype=float)
+    amount_in_preferred = amounts * rates[currency_codes]
+
+    cycle_codes = pd.Categorical(billing_cycles, categories=BILLING_CYCLES).codes
+    monthly_cost = amount_in_preferred * MONTHLY_FACTORS[cycle_codes]
+    yearly_cost = amount_in_preferred * YEARLY_FACTORS[cycle_codes]
+
+    # Aggregates only include active subscriptions with a known billing cycle
+    counted = active & (cycle_codes >= 0)
+    by_cycle = np.bincount(
+        cycle_codes[counted], weights=monthly_cost[counted], minlength=len(BILLING_CYCLES)
+    )
+    cycle_counts = np.bincount(
+        cycle_codes[counted], weights=counts[counted], minlength=len(BILLING_CYCLES)
+    )
+    by_currency = np.bincount(
+        currency_codes[counted], weights=monthly_cost[counted], minlength=len(currency_names)
+    )
+
+    monthly_total = float(monthly_cost[counted].sum())
+
+    return {
+        'currency': target_currency,
+        'rate_date': rate_date.isoformat() if rate_date is not None else None,
+        'amount_in_preferred': amount_in_preferred,
+        'monthly_cost': monthly_cost,
+        'yearly_cost': yearly_cost,
+        'monthly_total': monthly_total,
+        'yearly_total': monthly_total * 12,
+        'spending_by_cycle': {
+            cycle: float(total)
+            for cycle, total in zip(BILLING_CYCLES, by_cycle)
+            if cycle != 'lifetime'
+        },
+        'spending_by_currency': {
+            currency: float(total) for currency, total in zip(currency_names, by_currency)
+        },
+        'cycle_counts': {
+            cycle: int(count) for cycle, count in zip(BILLING_CYCLES, cycle_counts)
+        },
+        'total_subscriptions': int(counts.sum()),
+        'active_subscriptions': int(counts[active].sum()),
+    }
+
+def compute_past_spending(user_id, target_currency, since, until):
+    """
+    Sum what a user's active subscriptions charged after `since` and up to
+    `until`, converting each payment at the exchange rate of its payment day.
+    Payments from before the rate history starts use the current rate.
+    """
+    payments = [
+        (amount or 0.0, currency or target_currency, payment.date())
+        for amount, currency, billing_cycle, start_date in db.session.query(
+            Subscription.amount,
+            Subscription.currency,
+            Subscription.billing_cycle,
+            Subscription.start_date
+        ).filter(
+            Subscription.user_id == user_id,
+            Subscription.is_active == True
+        )
+        for payment in payment_dates(start_date, billing_cycle, since, until)
+    ]
+
+    rates = get_rates_as_of(
+        {currency for _, currency, _ in payments},
+        target_currency,
+        {day for _, _, day in payments}
+    )
+    return float(sum(
+        amount * rates[(currency, day)] if (currency, day) in rates
+        else convert_currency(amount, currency, target_currency)
+        for amount, currency, day in payments
+    ))
+
+def summarize_costs(costs):
+    """Return the JSON-serializable aggregate part of a compute_costs result."""
+    return {
+        key: value for key, value in costs.items()
+        if not isinstance(value, np.ndarray)
+    }
@@ -0,0 +1,270 @@
+"""
+Bulk import of subscriptions from CSV files.
+
+Rows are parsed in chunks. The user's existing subscriptions are looked up
+once by name, and each chunk is written with a handful of bulk statements
+instead of a query, a flush and possibly several HTTP requests per row.
+Logos for new subscriptions are resolved afterwards in a background thread.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from sqlalchemy import delete, insert, select, update
+from app import app, db
+from models import Subscription, Reminder
+from recurrence import next_occurrence
+
+logger = logging.getLogger(__name__)
+
+# CSV rows written to the database per round of bulk statements
+IMPORT_CHUNK_SIZE = 1000
+
+# Reminders created for new subscriptions when the CSV has none
+DEFAULT_REMINDER_DAYS = [1, 7, 14]
+
+# Subscriptions whose logo URLs are committed together by the logo job
+LOGO_BATCH_SIZE = 100
+
+# Logo lookups may probe websites for favicons, so they never run in a request
+_logo_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='logo-resolver')
+
+def parse_reminders(value):
+    """
+    Parse the Reminders column of an exported CSV, e.g.
+    "7 days (Email: True, Push: False); 1 days (Email: True, Push: True)".
+    Returns a list of (days_before, email, push) tuples, skipping invalid entries.
+    """
+    reminders = []
+    for reminder_str in value.split(';'):
+        try:
+            days = int(reminder_str.split(' days')[0])
+        except (ValueError, IndexError):
+            continue
+        reminders.append((days, 'Email: True' in reminder_str, 'Push: True' in reminder_str))
+    return reminders
+
+def parse_row(row, now):
+    """Turn one CSV row into subscription column values, logo URL and reminders."""
+    start_date_str = row.get('Start Date', now.strftime('%Y-%m-%d'))
+    try:
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
+    except ValueError:
+        start_date = now
+
+    values = {
+        'name': row['Name'],
+        'url': row.get('URL', ''),
+        'amount': float(row.get('Amount', 0)),
+        'currency': row.get('Currency', 'USD'),
+        'billing_cycle': row.get('Billing Cycle', 'monthly'),
+        'start_date': start_date,
+        'notes': row.get('Notes', ''),
+        'is_active': row.get('Active', 'Yes') == 'Yes',
+    }
+
+    # None means the CSV has no reminders for this row (not even an empty list)
+    reminders = parse_reminders(row['Reminders']) if row.get('Reminders') else None
+
+    return values, row.get('Logo URL', ''), reminders
+
+def next_payment_date(start_date, billing_cycle, current, now):
+    """Same rules as Subscription.calculate_next_payment_date, for plain values."""
+    if billing_cycle == 'lifetime':
+        return current
+    if not current or current < now:
+        return next_occurrence(start_date or now, billing_cycle, now) or current
+    return current
+
+def load_existing(user_id):
+    """Return the user's subscriptions keyed by name, with the fields the import needs."""
+    existing = {}
+    rows = db.session.execute(
+        select(
+            Subscription.id,
+            Subscription.name,
+            Subscription.start_date,
+            Subscription.billing_cycle,
+            Subscription.next_payment_date
+        ).filter_by(user_id=user_id).order_by(Subscription.id)
+    )
+    for row in rows:
+        # Like the old per-row lookup, the first subscription with a name wins
+        existing.setdefault(row.name, {
+            'id': row.id,
+            'start_date': row.start_date,
+            'billing_cycle': row.billing_cycle,
+            'next_payment_date': row.next_payment_date,
+        })
+    return existing
+
+def _plan_chunk(rows, existing, now):
+    """
+    Merge a chunk of CSV rows into one planned write per subscription name.
+    A name that appears again later in the file updates the earlier row,
+    exactly as if the rows had been imported one by one.
+    """
+    plans = {}
+    for row in rows:
+        values, logo_url, reminders = parse_row(row, now)
+        name = values['name']
+        plan = plans.get(name)
+
+        if plan is None:
+            current = existing.get(name)
+            plan = plans[name] = {
+                'id': current['id'] if current else None,
+                'values': {},
+                'schedule': current,
+                'reminders': None,
+                # Existing subscriptions lose their reminders unless the CSV has some
+                'replace_reminders': current is not None,
+            }
+        else:
+            # Seen earlier in this chunk: the row now acts as an update
+            plan['replace_reminders'] = True
+
+        if logo_url:
+            values['logo_url'] = logo_url
+        plan['values'].update(values)
+        plan['reminders'] = reminders
+
+    for plan in plans.values():
+        values = plan['values']
+        schedule = plan['schedule']
+        current = None
+        # A changed start date or billing cycle invalidates the stored date
+        if schedule and (schedule['start_date'], schedule['billing_cycle']) == (values['start_date'], values['billing_cycle']):
+            current = schedule['next_payment_date']
+        values['next_payment_date'] = next_payment_date(
+            values['start_date'], values['billing_cycle'], current, now
+        )
+
+    return plans
+
+def _write_chunk(user_id, plans, existing, now):
+    """Write one chunk of planned subscriptions. Returns (created_ids, updated_ids)."""
+    new_plans = [plan for plan in plans.values() if plan['id'] is None]
+    update_plans = [plan for plan in plans.values() if plan['id'] is not None]
+
+    if new_plans:
+        created = db.session.execute(
+            insert(Subscription).returning(Subscription.id, sort_by_parameter_order=True),
+            [{'user_id': user_id, 'logo_url': None, **plan['values']} for plan in new_plans]
+        ).scalars().all()
+        for plan, subscription_id in zip(new_plans, created):
+            plan['id'] = subscription_id
+
+    if update_plans:
+        db.session.execute(
+            update(Subscription),
+            [{'id': plan['id'], 'updated_at': now, **plan['values']} for plan in update_plans]
+        )
+
+    replaced_ids = [plan['id'] for plan in plans.values() if plan['replace_reminders']]
+    if replaced_ids:
+        db.session.execute(
+            delete(Reminder)
+            .where(Reminder.subscription_id.in_(replaced_ids))
+            .execution_options(synchronize_session=False)
+        )
+
+    reminder_rows = []
+    for plan in plans.values():
+        reminders = plan['reminders']
+        if reminders is None and not plan['replace_reminders'] and plan['values']['billing_cycle'] != 'lifetime':
+            reminders = [(days, True, False) for days in DEFAULT_REMINDER_DAYS]
+        for days, email, push in reminders or []:
+            reminder_rows.append({
+                'user_id': user_id,
+                'subscription_id': plan['id'],
+                'days_before': days,
+                'email_notification': email,
+                'push_notification': push,
+            })
+    if reminder_rows:
+        db.session.execute(insert(Reminder), reminder_rows)
+
+    # Later chunks see this chunk's subscriptions as existing ones
+    for plan in plans.values():
+        values = plan['values']
+        existing[values['name']] = {
+            'id': plan['id'],
+            'start_date': values['start_date'],
+            'billing_cycle': values['billing_cycle'],
+            'next_payment_date': values['next_payment_date'],
+        }
+
+    return [plan['id'] for plan in new_plans if 'logo_url' not in plan['values']], [plan['id'] for plan in update_plans]
+
+def import_subscriptions(user_id, rows, on_chunk=None):
+    """
+    Import subscriptions for a user from an iterable of CSV rows (dicts).
+
+    Existing subscriptions are matched by name and updated, other rows are
+    created. Nothing is committed, so the caller decides about the
+    transaction. `on_chunk`, if given, is called with the statistics of
+    each chunk right after it was written, e.g. to commit it.
+    Returns a dict with `rows`, `created` and `updated` counts and
+    `needs_logo`, the ids of new subscriptions without a logo URL.
+    """
+    now = datetime.utcnow()
+    existing = load_existing(user_id)
+    stats = {'rows': 0, 'created': 0, 'updated': 0, 'needs_logo': []}
+
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, IMPORT_CHUNK_SIZE))
+        if not chunk:
+            break
+
+        plans = _plan_chunk(chunk, existing, now)
+        needs_logo, updated = _write_chunk(user_id, plans, existing, now)
+        chunk_stats = {
+            'rows': len(chunk),
+            'created': len(plans) - len(updated),
+            'updated': len(updated),
+            'needs_logo': needs_logo,
+        }
+
+        for key in ('rows', 'created', 'updated'):
+            stats[key] += chunk_stats[key]
+        stats['needs_logo'].extend(needs_logo)
+
+        if on_chunk is not None:
+            on_chunk(chunk_stats)
+
+    return stats
+
+def _resolve_logos(subscription_ids):
+    """Look up logos for subscriptions that don't have one yet and store them."""
+    from utils import get_logo_urls_for_services
+
+    with app.app_context():
+        try:
+            pending = db.session.execute(
+                select(Subscription.id, Subscription.name, Subscription.url)
+                .where(Subscription.id.in_(subscription_ids), Subscription.logo_url.is_(None))
+            ).all()
+
+            # Many imported rows share a service, so each (name, URL) is looked
+            # up once, and websites without a known logo are probed together
+            logos = get_logo_urls_for_services({(row.name, row.url) for row in pending})
+
+            for start in range(0, len(pending), LOGO_BATCH_SIZE):
+                batch = pending[start:start + LOGO_BATCH_SIZE]
+                db.session.execute(
+                    update(Subscription),
+                    [{'id': row.id, 'logo_url': logos[(row.name, row.url)]} for row in batch]
+                )
+                db.session.commit()
+
+            logger.info(f"Resolved logos for {len(pending)} imported subscriptions")
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error resolving logos for imported subscriptions: {str(e)}")
+
+def resolve_logos_in_background(subscription_ids):
+    """Queue logo resolution for newly imported subscriptions."""
+    if subscription_ids:
+        _logo_executor.submit(_resolve_logos, list(subscription_ids))
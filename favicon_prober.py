@@ -0,0 +1,120 @@
+"""
+Concurrent favicon probing.
+
+A website's favicon is found by sending HEAD requests to a few common
+favicon paths, in order of preference. FaviconProber probes many websites
+at once on a thread pool sharing one pooled HTTP session. Requests to a
+single host are limited so a batch never floods one website, and the
+less preferred paths of a website are skipped once a preferred one has
+answered.
+
+This module only depends on requests and the standard library so the
+standalone maintenance scripts can share it with the app.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+
+# Common favicon locations, most preferred first
+FAVICON_PATHS = ['/favicon.ico', '/favicon.png', '/apple-touch-icon.png', '/apple-icon.png']
+
+# Timeout in seconds for each favicon probe request
+FAVICON_PROBE_TIMEOUT = 2
+
+def split_site(url):
+    """Return the (scheme, domain) of a website URL, or None if it has no domain."""
+    if not url:
+        return None
+    parsed_url = urlparse(url)
+    if not parsed_url.netloc:
+        return None
+    return parsed_url.scheme or 'https', parsed_url.netloc.lower()
+
+def google_favicon(domain):
+    """Favicon of a website from Google's favicon service, for websites without a direct one."""
+    return f"https://www.google.com/s2/favicons?domain={domain}&sz=64"
+
+class FaviconProber:
+    """Probes websites for a direct favicon, concurrently and with per-host limits."""
+
+    def __init__(self, session=None, max_workers=16, per_host=2, timeout=FAVICON_PROBE_TIMEOUT):
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        self.session = session
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.timeout = timeout
+        # domain -> [request slots, number of batches probing it]. Entries
+        # are dropped when the last batch finishes, so a long-lived prober
+        # doesn't keep one for every website it has ever seen.
+        self._host_slots = {}
+        self._host_slots_lock = threading.Lock()
+
+    def _claim_hosts(self, domains):
+        """Return each domain's request slots, shared with batches probing it at the same time."""
+        with self._host_slots_lock:
+            slots = {}
+            for domain in domains:
+                entry = self._host_slots.get(domain)
+                if entry is None:
+                    entry = self._host_slots[domain] = [threading.BoundedSemaphore(self.per_host), 0]
+                entry[1] += 1
+                slots[domain] = entry[0]
+            return slots
+
+    def _release_hosts(self, domains):
+        with self._host_slots_lock:
+            for domain in domains:
+                entry = self._host_slots[domain]
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._host_slots[domain]
+
+    def _probe_candidate(self, slot, url, index, answered):
+        with slot:
+            # A more preferred path of this website already answered
+            if any(answered[:index]):
+                return
+            try:
+                response = self.session.head(url, timeout=self.timeout)
+                answered[index] = response.status_code == 200
+            except requests.RequestException:
+                answered[index] = False
+
+    def probe_many(self, sites):
+        """
+        Probe websites given as (scheme, domain) pairs; each domain is probed once.
+        Returns a dict mapping every domain to its most preferred favicon URL
+        that answered with 200, or None if none did.
+        """
+        candidates = {}
+        for scheme, domain in sites:
+            if domain not in candidates:
+                candidates[domain] = [f"{scheme}://{domain}{path}" for path in FAVICON_PATHS]
+        if not candidates:
+            return {}
+
+        answered = {domain: [None] * len(FAVICON_PATHS) for domain in candidates}
+        slots = self._claim_hosts(candidates)
+        try:
+            # Preferred paths are queued first, round-robin across websites
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='favicon-probe') as executor:
+                for index in range(len(FAVICON_PATHS)):
+                    for domain, urls in candidates.items():
+                        executor.submit(self._probe_candidate, slots[domain], urls[index], index, answered[domain])
+        finally:
+            self._release_hosts(candidates)
+
+        return {
+            domain: next((url for url, ok in zip(urls, answered[domain]) if ok), None)
+            for domain, urls in candidates.items()
+        }
+
+    def probe(self, scheme, domain):
+        """Probe a single website. Returns its favicon URL or None."""
+        return self.probe_many([(scheme, domain)])[domain]
@@ -0,0 +1,138 @@
+"""
+Image processing for uploaded subscription logos.
+
+process_logo_image runs in a worker process: it decodes an uploaded image
+once and writes it as WebP in every size of LOGO_SIZES, each encoded at the
+highest quality that fits the byte budget. SVG logos are only size-checked
+and copied.
+
+normalize_logo turns a downloaded logo into one small WebP the same way.
+
+This module only depends on Pillow and the standard library, so worker
+processes never need the app. Pillow is imported on first use to keep it
+out of the app's startup.
+"""
+import os
+import tempfile
+from io import BytesIO
+
+# Logo sizes in px (largest first); the largest one is the logo_url
+LOGO_SIZES = (200, 64, 32)
+
+# Byte budget for every stored logo file
+LOGO_MAX_BYTES = 51200  # 50KB
+
+# WebP quality bounds for the budget search
+WEBP_MAX_QUALITY = 90
+WEBP_MIN_QUALITY = 20
+
+def logo_file_paths(base_path, extension='webp'):
+    """Return {size: path} of the files of one logo; the largest size has no suffix."""
+    if extension == 'svg':
+        return {LOGO_SIZES[0]: f"{base_path}.svg"}
+    return {
+        size: f"{base_path}.{extension}" if size == LOGO_SIZES[0] else f"{base_path}_{size}.{extension}"
+        for size in LOGO_SIZES
+    }
+
+def encode_webp(img, max_bytes=LOGO_MAX_BYTES):
+    """
+    Encode an image as WebP at the highest quality that fits in max_bytes,
+    found by binary search. Returns the bytes, or None if even the lowest
+    quality is too large.
+    """
+    def encode(quality):
+        buffer = BytesIO()
+        img.save(buffer, format='WEBP', quality=quality, method=4)
+        return buffer.getvalue()
+
+    # Most logos fit at the top quality, which costs a single encode
+    data = encode(WEBP_MAX_QUALITY)
+    if len(data) <= max_bytes:
+        return data
+
+    best = None
+    low, high = WEBP_MIN_QUALITY, WEBP_MAX_QUALITY - 1
+    while low <= high:
+        quality = (low + high) // 2
+        data = encode(quality)
+        if len(data) <= max_bytes:
+            best, low = data, quality + 1
+        else:
+            high = quality - 1
+    return best
+
+def _load_logo(source, size):
+    """Decode an image file (path or file object) for logos of at most size px, as RGB(A)."""
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        # Let JPEG decode at a reduced scale that still covers the size
+        image.draft('RGB', (size, size))
+        img = ImageOps.exif_transpose(image)
+        return img.convert('RGBA' if img.has_transparency_data else 'RGB')
+
+def normalize_logo(data, size=64):
+    """
+    Turn downloaded logo image bytes into a WebP of at most size px within
+    the byte budget. Raises ValueError (or Pillow's errors) if that fails.
+    """
+    img = _load_logo(BytesIO(data), size)
+    img.thumbnail((size, size))
+    webp = encode_webp(img)
+    if webp is None:
+        raise ValueError(f"Logo doesn't fit in {LOGO_MAX_BYTES} bytes at {size}px")
+    return webp
+
+def write_file(path, data):
+    """
+    Write bytes to path atomically: they go to a temporary file of our own
+    next to the target, which is then renamed over it. Readers never see a
+    partial file, concurrent writers don't share a temporary file, and a
+    failed write leaves nothing behind.
+    """
+    f = tempfile.NamedTemporaryFile(dir=os.path.dirname(path) or '.', suffix='.tmp', delete=False)
+    try:
+        with f:
+            f.write(data)
+        os.replace(f.name, path)
+    except BaseException:
+        if os.path.exists(f.name):
+            os.remove(f.name)
+        raise
+
+def process_logo_image(source_path, base_path, extension):
+    """
+    Turn an uploaded image file into logo files next to base_path.
+    Returns the list of written paths, largest size first.
+    Raises ValueError if the image can't fit the byte budget.
+    """
+    # Logo files are named after their content, so existing ones are up to
+    # date. Missing ones are written again, e.g. when the last reference to
+    # the logo was released just before this upload took a new one.
+    paths = logo_file_paths(base_path, 'svg' if extension == 'svg' else 'webp')
+    if all(os.path.exists(path) for path in paths.values()):
+        return [paths[size] for size in LOGO_SIZES if size in paths]
+
+    if extension == 'svg':
+        if os.path.getsize(source_path) > LOGO_MAX_BYTES:
+            raise ValueError("SVG logo is larger than 50KB")
+        path = paths[LOGO_SIZES[0]]
+        with open(source_path, 'rb') as f:
+            write_file(path, f.read())
+        return [path]
+
+    img = _load_logo(source_path, LOGO_SIZES[0])
+
+    # Every size is scaled down from the previous one, from the single decode
+    encoded = {}
+    for size in LOGO_SIZES:
+        img.thumbnail((size, size))
+        data = encode_webp(img)
+        if data is None:
+            raise ValueError(f"Logo doesn't fit in {LOGO_MAX_BYTES} bytes at {size}px")
+        encoded[size] = data
+
+    for size, data in encoded.items():
+        write_file(paths[size], data)
+    return [paths[size] for size in LOGO_SIZES]
@@ -0,0 +1,157 @@
+"""
+Background queue for CSV imports.
+
+An upload is saved to disk and recorded as an ImportJob, then imported by a
+local worker pool so the request returns right away. Every chunk of rows is
+committed together with the job's progress, which makes an interrupted job
+safe to resume: it skips the rows that were already committed. The scheduler
+leader periodically picks up jobs that were queued or running in a process
+that has since gone away.
+"""
+import csv
+import logging
+import os
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import islice
+from sqlalchemy import func, or_, select, update
+from app import app, db
+from models import ImportJob
+from csv_import import import_subscriptions, resolve_logos_in_background
+
+logger = logging.getLogger(__name__)
+
+# Imports running at the same time in one process
+IMPORT_WORKERS = 2
+
+# A running job without a heartbeat for this long (and a queued job that
+# was never started) is considered abandoned and gets resumed elsewhere
+STALE_JOB_SECONDS = 300
+
+_import_executor = ThreadPoolExecutor(max_workers=IMPORT_WORKERS, thread_name_prefix='csv-import')
+
+def submit_import_job(user_id, file):
+    """Save an uploaded CSV file, record an ImportJob for it and queue it. Returns the job."""
+    folder = app.config['IMPORT_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+
+    job_id = uuid.uuid4().hex
+    job = ImportJob(
+        id=job_id,
+        user_id=user_id,
+        filename=file.filename,
+        file_path=os.path.join(folder, f"{job_id}.csv")
+    )
+
+    # Copy the upload to disk in blocks rather than reading it into memory
+    with open(job.file_path, 'wb') as f:
+        shutil.copyfileobj(file.stream, f)
+
+    db.session.add(job)
+    db.session.commit()
+
+    _import_executor.submit(run_import_job, job.id)
+    return job
+
+def _claim_job(job_id):
+    """
+    Mark a job as running in this process. Only one process can claim a
+    job: queued jobs and abandoned running jobs can be claimed, a job with
+    a recent heartbeat can't. Returns True if the job was claimed.
+    """
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=STALE_JOB_SECONDS)
+    claimed = db.session.execute(
+        update(ImportJob)
+        .where(
+            ImportJob.id == job_id,
+            or_(
+                ImportJob.status == 'queued',
+                (ImportJob.status == 'running') & (ImportJob.heartbeat_at < stale_before)
+            )
+        )
+        .values(status='running', started_at=func.coalesce(ImportJob.started_at, now), heartbeat_at=now)
+        .returning(ImportJob.id)
+        .execution_options(synchronize_session=False)
+    ).first()
+    db.session.commit()
+    return claimed is not None
+
+def run_import_job(job_id):
+    """Import a job's CSV file in committed chunks. Runs in a worker thread."""
+    with app.app_context():
+        try:
+            if not _claim_job(job_id):
+                return
+
+            job = db.session.get(ImportJob, job_id)
+            logger.info(f"Starting CSV import {job.id} for user {job.user_id} at row {job.rows_processed}")
+
+            def checkpoint(chunk):
+                # Progress is committed together with the chunk it describes
+                job.rows_processed += chunk['rows']
+                job.created_count += chunk['created']
+                job.updated_count += chunk['updated']
+                job.heartbeat_at = datetime.utcnow()
+                db.session.commit()
+                resolve_logos_in_background(chunk['needs_logo'])
+
+            with open(job.file_path, newline='', encoding='utf-8-sig') as f:
+                rows = csv.DictReader(f)
+                # Rows before the checkpoint were committed by an earlier attempt
+                rows = islice(rows, job.rows_processed, None)
+                import_subscriptions(job.user_id, rows, on_chunk=checkpoint)
+
+            job.status = 'completed'
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            logger.info(
+                f"CSV import {job.id} completed: {job.rows_processed} rows "
+                f"({job.rows_per_second():.0f} rows/s)"
+            )
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"CSV import {job_id} failed: {str(e)}")
+            db.session.execute(
+                update(ImportJob)
+                .where(ImportJob.id == job_id)
+                .values(status='failed', error=str(e), finished_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+        finally:
+            job = db.session.get(ImportJob, job_id)
+            if job and job.status in ('completed', 'failed') and os.path.exists(job.file_path):
+                os.remove(job.file_path)
+
+def resume_import_jobs():
+    """Queue jobs that were abandoned by another process. Run by the scheduler."""
+    stale_before = datetime.utcnow() - timedelta(seconds=STALE_JOB_SECONDS)
+    job_ids = db.session.execute(
+        select(ImportJob.id).where(or_(
+            (ImportJob.status == 'queued') & (ImportJob.created_at < stale_before),
+            (ImportJob.status == 'running') & (ImportJob.heartbeat_at < stale_before)
+        ))
+    ).scalars().all()
+
+    for job_id in job_ids:
+        logger.info(f"Resuming abandoned CSV import {job_id}")
+        _import_executor.submit(run_import_job, job_id)
+
+def import_job_status(job):
+    """Return the JSON-serializable status of an import job."""
+    return {
+        'id': job.id,
+        'filename': job.filename,
+        'status': job.status,
+        'rows_processed': job.rows_processed,
+        'created': job.created_count,
+        'updated': job.updated_count,
+        'rows_per_second': round(job.rows_per_second(), 1),
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
@@ -0,0 +1,74 @@
+"""
+Bulk load historic exchange rates from a local CSV file.
+
+Usage: python load_rate_history.py rates.csv
+
+The file needs a header row with the columns date (YYYY-MM-DD), currency and
+rate, where rate is the price of one EXCHANGE_RATE_BASE_CURRENCY unit in that
+currency. Days that are already in the history are left untouched, so the
+same file can be loaded more than once.
+"""
+import csv
+import os
+import sys
+
+# A one-off script: app.py must not start a scheduler (and possibly win the
+# leader election) while it is being imported below.
+os.environ.setdefault('RUN_SCHEDULER', 'false')
+
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app import app, db
+from models import ExchangeRateHistory
+
+# Rows sent to the database per INSERT statement
+BATCH_SIZE = 5000
+
+def insert_batch(rows):
+    """Insert a batch of history rows, skipping days that already exist."""
+    result = db.session.execute(
+        pg_insert(ExchangeRateHistory)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=['base_currency', 'target_currency', 'rate_date'])
+    )
+    return result.rowcount
+
+def load_rate_history(path):
+    """Stream the CSV file into the exchange rate history in batches. Returns (read, inserted)."""
+    base = app.config['EXCHANGE_RATE_BASE_CURRENCY']
+    read = 0
+    inserted = 0
+    batch = []
+    
+    with open(path, newline='') as csv_file:
+        for row in csv.DictReader(csv_file):
+            currency = row['currency'].strip().upper()
+            if currency == base:
+                continue
+            
+            batch.append({
+                'base_currency': base,
+                'target_currency': currency,
+                'rate_date': datetime.strptime(row['date'].strip(), '%Y-%m-%d').date(),
+                'rate': float(row['rate'])
+            })
+            read += 1
+            
+            if len(batch) >= BATCH_SIZE:
+                inserted += insert_batch(batch)
+                batch = []
+    
+    if batch:
+        inserted += insert_batch(batch)
+    
+    db.session.commit()
+    return read, inserted
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Usage: python load_rate_history.py rates.csv")
+        sys.exit(1)
+    
+    with app.app_context():
+        read, inserted = load_rate_history(sys.argv[1])
+        print(f"Read {read} rates, added {inserted} new history rows.")
@@ -0,0 +1,162 @@
+"""
+Logo bundles for subscription lists.
+
+A page listing many subscriptions would make one request per logo. Instead
+it loads a single bundle: a JSON object mapping each logo URL of the user's
+subscriptions to a data: URI of the logo. The bundle is named after a hash
+of the set of logo URLs, so it can be cached for good and a new one is used
+as soon as any subscription's logo_url changes.
+
+Bundles are built from local files only (uploaded logos and the logo proxy's
+cache), so building one never waits on a remote host. Remote logos the proxy
+hasn't cached yet are left out and loaded on their own; a bundle is only
+stored once it's complete. Remote logos the proxy failed to fetch get its
+placeholder, and a bundle with placeholders is only kept until the proxy
+tries them again.
+"""
+import base64
+import hashlib
+import json
+import mimetypes
+import os
+import time
+from flask import url_for
+from sqlalchemy import select
+from app import app, db
+from image_pipeline import LOGO_MAX_BYTES, logo_file_paths, write_file
+from logo_proxy import LOGO_RETRY_SECONDS, cached_logo_path, fetch_failed_recently, placeholder_svg
+from models import Subscription
+from utils import LOGO_UPLOAD_DIR
+
+# Size in px of the uploaded logo variant put in bundles
+BUNDLED_UPLOAD_SIZE = 64
+
+# Logos larger than this are loaded on their own instead
+MAX_BUNDLED_LOGO_BYTES = LOGO_MAX_BYTES
+
+# Stored bundles kept on disk; the oldest are removed beyond this
+MAX_STORED_BUNDLES = 500
+
+def user_logo_urls(user_id):
+    """Return the sorted distinct logo URLs of a user's subscriptions."""
+    return sorted(db.session.execute(
+        select(Subscription.logo_url)
+        .where(Subscription.user_id == user_id, Subscription.logo_url.isnot(None))
+        .distinct()
+    ).scalars())
+
+def logo_bundle_key(logo_urls):
+    """Return the bundle key of a set of logo URLs."""
+    return hashlib.sha256('\n'.join(sorted(set(logo_urls))).encode('utf-8')).hexdigest()
+
+def logo_bundle_url(user_id):
+    """Return the URL of the logo bundle of a user's subscriptions."""
+    return url_for('logos', key=logo_bundle_key(user_logo_urls(user_id)))
+
+def _bundle_folder():
+    return os.path.join(app.config['LOGO_CACHE_FOLDER'], 'bundles')
+
+def _bundle_path(key, final):
+    name = f"{key}.json" if final else f"{key}.placeholders.json"
+    return os.path.join(_bundle_folder(), name)
+
+def stored_bundle_path(key):
+    """
+    Return (path, final) of a stored bundle, or None if it isn't stored.
+    Bundles with placeholders aren't final and expire after LOGO_RETRY_SECONDS.
+    """
+    path = _bundle_path(key, True)
+    if os.path.exists(path):
+        return path, True
+    path = _bundle_path(key, False)
+    try:
+        if time.time() - os.path.getmtime(path) < LOGO_RETRY_SECONDS:
+            return path, False
+    except FileNotFoundError:
+        pass
+    return None
+
+def _local_logo_path(logo_url):
+    """Return the local file of a logo, or None if there is none (yet)."""
+    if logo_url.startswith(('http://', 'https://')):
+        return cached_logo_path(logo_url)
+
+    prefix = f"/{LOGO_UPLOAD_DIR}/"
+    filename = logo_url[len(prefix):] if logo_url.startswith(prefix) else ''
+    if not filename or os.path.basename(filename) != filename:
+        return None
+
+    # Uploaded logos are shown small, so their small variant is bundled
+    base_path, extension = os.path.splitext(os.path.join(LOGO_UPLOAD_DIR, filename))
+    paths = logo_file_paths(base_path, extension[1:])
+    for path in (paths.get(BUNDLED_UPLOAD_SIZE), f"{base_path}{extension}"):
+        if path and os.path.exists(path):
+            return path
+    return None
+
+def _data_uri(path):
+    if os.path.getsize(path) > MAX_BUNDLED_LOGO_BYTES:
+        return None
+    mimetype = mimetypes.guess_type(path)[0]
+    if not mimetype or not mimetype.startswith('image/'):
+        return None
+    with open(path, 'rb') as f:
+        return f"data:{mimetype};base64,{base64.b64encode(f.read()).decode('ascii')}"
+
+def _placeholder_data_uri(logo_url):
+    svg = placeholder_svg(logo_url).encode('utf-8')
+    return f"data:image/svg+xml;base64,{base64.b64encode(svg).decode('ascii')}"
+
+def build_logo_bundle(logo_urls):
+    """
+    Return (bundle, complete, placeholders): the bundle of the logos that are
+    available locally, whether every logo that could be bundled is in it, and
+    whether some of them are placeholders for logos that couldn't be fetched.
+    """
+    bundle = {}
+    complete = True
+    placeholders = False
+    for logo_url in sorted(set(logo_urls)):
+        path = _local_logo_path(logo_url)
+        if path is None:
+            if not logo_url.startswith(('http://', 'https://')):
+                continue
+            if fetch_failed_recently(logo_url):
+                bundle[logo_url] = _placeholder_data_uri(logo_url)
+                placeholders = True
+            else:
+                # Remote logos missing from the proxy cache will be there later
+                complete = False
+            continue
+        data_uri = _data_uri(path)
+        if data_uri:
+            bundle[logo_url] = data_uri
+    return bundle, complete, placeholders
+
+def _prune_stored_bundles(folder):
+    bundles = [entry for entry in os.scandir(folder) if entry.name.endswith('.json')]
+    if len(bundles) <= MAX_STORED_BUNDLES:
+        return
+    bundles.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in bundles[:len(bundles) - MAX_STORED_BUNDLES]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+def store_logo_bundle(key, bundle, final=True):
+    """
+    Write a complete bundle to disk. Returns its path. Bundles with
+    placeholders are stored as not final, see stored_bundle_path.
+    """
+    folder = _bundle_folder()
+    os.makedirs(folder, exist_ok=True)
+    path = _bundle_path(key, final)
+    write_file(path, json.dumps(bundle, separators=(',', ':')).encode('utf-8'))
+    if final:
+        try:
+            os.remove(_bundle_path(key, False))
+        except FileNotFoundError:
+            pass
+    _prune_stored_bundles(folder)
+    return path
@@ -0,0 +1,205 @@
+"""
+Catalog of known service logos.
+
+The catalog is compiled once at import into two indexes:
+
+- an Aho-Corasick automaton over normalized service names, which finds the
+  longest known name contained in a subscription name in one pass over it
+  (so 'Apple Music Family' matches 'apple music', not 'apple');
+- a trie over reversed domain labels, which finds the most specific known
+  domain for a URL's host (music.apple.com before apple.com).
+
+This module only depends on the standard library so the standalone
+maintenance scripts can share it with the app.
+"""
+from collections import deque
+from urllib.parse import urlparse
+
+# Service names (lowercase) mapped to their logo URLs.
+# Using popular service logos from CDNs for recognizable services
+SERVICE_LOGOS = {
+    'netflix': 'https://upload.wikimedia.org/wikipedia/commons/0/08/Netflix_2015_logo.svg',
+    'spotify': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/spotify/spotify-original.svg',
+    'apple': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/apple/apple-original.svg',
+    'apple tv': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/apple/apple-original.svg',
+    'apple music': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/apple/apple-original.svg',
+    'amazon': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/amazonwebservices/amazonwebservices-original.svg',
+    'amazon prime': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/amazonwebservices/amazonwebservices-original.svg',
+    'google': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/google/google-original.svg',
+    'google one': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/google/google-original.svg',
+    'youtube': 'https://www.youtube.com/favicon.ico',
+    'youtube premium': 'https://www.youtube.com/favicon.ico',
+    'github': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/github/github-original.svg',
+    'replit': 'https://replit.com/public/icons/apple-icon-180.png',
+    'slack': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/slack/slack-original.svg',
+    'microsoft': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/microsoft/microsoft-original.svg',
+    'office 365': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/microsoft/microsoft-original.svg',
+    'xbox': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/microsoft/microsoft-original.svg',
+    'dropbox': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/dropbox/dropbox-original.svg',
+    'adobe': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/adobe/adobe-original.svg',
+    'photoshop': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/photoshop/photoshop-plain.svg',
+    'digitalocean': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/digitalocean/digitalocean-original.svg',
+    'hulu': 'https://upload.wikimedia.org/wikipedia/commons/e/e4/Hulu_Logo.svg',
+    'disney+': 'https://upload.wikimedia.org/wikipedia/commons/3/3e/Disney%2B_logo.svg',
+    'twitch': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/twitch/twitch-original.svg',
+    'bolt': 'https://www.google.com/s2/favicons?domain=bolt.new&sz=64',
+    'cursor': 'https://www.google.com/s2/favicons?domain=cursor.sh&sz=64',
+    'gitlab': 'https://gitlab.com/favicon.ico',
+    'granola': 'https://www.google.com/s2/favicons?domain=granola.ai&sz=64',
+    'linear': 'https://www.google.com/s2/favicons?domain=linear.app&sz=64',
+    'lovable': 'https://www.google.com/s2/favicons?domain=lovable.dev&sz=64',
+    'notability': 'https://notability.com/favicon.ico',
+    'notion': 'https://www.notion.so/images/favicon.ico',
+    'perplexity': 'https://www.perplexity.ai/favicon.ico',
+    'perplexity ai': 'https://www.perplexity.ai/favicon.ico',
+    'superhuman': 'https://www.google.com/s2/favicons?domain=superhuman.com&sz=64',
+    'todoist': 'https://todoist.com/favicon.ico',
+    'v0': 'https://www.google.com/s2/favicons?domain=v0.dev&sz=64',
+}
+
+# Website domains of the services above, so a subscription with a known URL
+# gets the right logo even when its name doesn't mention the service
+SERVICE_DOMAINS = {
+    'netflix.com': 'netflix',
+    'spotify.com': 'spotify',
+    'apple.com': 'apple',
+    'tv.apple.com': 'apple tv',
+    'music.apple.com': 'apple music',
+    'amazon.com': 'amazon',
+    'primevideo.com': 'amazon prime',
+    'google.com': 'google',
+    'one.google.com': 'google one',
+    'youtube.com': 'youtube',
+    'github.com': 'github',
+    'replit.com': 'replit',
+    'slack.com': 'slack',
+    'microsoft.com': 'microsoft',
+    'office.com': 'office 365',
+    'xbox.com': 'xbox',
+    'dropbox.com': 'dropbox',
+    'adobe.com': 'adobe',
+    'digitalocean.com': 'digitalocean',
+    'hulu.com': 'hulu',
+    'disneyplus.com': 'disney+',
+    'twitch.tv': 'twitch',
+    'bolt.new': 'bolt',
+    'cursor.sh': 'cursor',
+    'cursor.com': 'cursor',
+    'gitlab.com': 'gitlab',
+    'granola.ai': 'granola',
+    'linear.app': 'linear',
+    'lovable.dev': 'lovable',
+    'notability.com': 'notability',
+    'notion.so': 'notion',
+    'perplexity.ai': 'perplexity',
+    'superhuman.com': 'superhuman',
+    'todoist.com': 'todoist',
+    'v0.dev': 'v0',
+}
+
+# Default logo for unknown services
+DEFAULT_LOGO = 'https://cdn-icons-png.flaticon.com/512/5053/5053352.png'
+
+def normalize_name(name):
+    """Case-fold a service name and collapse runs of whitespace."""
+    return ' '.join(name.casefold().split())
+
+def normalize_host(url):
+    """Return the lowercase host of a URL (or bare domain) without 'www.', or None."""
+    if not url:
+        return None
+    host = urlparse(url if '//' in url else f'//{url}').hostname
+    if not host:
+        return None
+    return host[4:] if host.startswith('www.') else host
+
+class LogoCatalog:
+    """Compiled longest-match indexes over service names and domains."""
+
+    def __init__(self, logos, domains):
+        self._build_name_automaton(logos)
+        self._build_domain_trie(logos, domains)
+
+    def _build_name_automaton(self, logos):
+        # Node 0 is the root. For every node: outgoing edges, failure link,
+        # and the longest keyword ending here (directly or via failure links)
+        self._edges = [{}]
+        self._fail = [0]
+        self._best = [None]
+
+        for name, logo in logos.items():
+            key = normalize_name(name)
+            node = 0
+            for char in key:
+                next_node = self._edges[node].get(char)
+                if next_node is None:
+                    next_node = len(self._edges)
+                    self._edges.append({})
+                    self._fail.append(0)
+                    self._best.append(None)
+                    self._edges[node][char] = next_node
+                node = next_node
+            self._best[node] = (len(key), logo)
+
+        # Breadth-first, so failure links always point at finished nodes.
+        # Each node's edges are then completed with the transitions of its
+        # failure node, which turns the automaton into a DFA: matching does
+        # exactly one dict lookup per character and never follows links.
+        queue = deque(self._edges[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._edges[node].items():
+                self._fail[child] = self._edges[self._fail[node]].get(char, 0)
+
+                inherited = self._best[self._fail[child]]
+                if inherited and (self._best[child] is None or inherited[0] > self._best[child][0]):
+                    self._best[child] = inherited
+                queue.append(child)
+
+            if node:
+                for char, target in self._edges[self._fail[node]].items():
+                    self._edges[node].setdefault(char, target)
+
+    def _build_domain_trie(self, logos, domains):
+        self._domains = {}
+        for domain, service in domains.items():
+            node = self._domains
+            for label in reversed(domain.lower().split('.')):
+                node = node.setdefault(label, {})
+            node[''] = logos[service]
+
+    def match_name(self, name):
+        """Return the logo of the longest known service name inside `name`, or None."""
+        edges, best = self._edges, self._best
+        root = edges[0]
+        best_length, best_logo = 0, None
+        node = 0
+        for char in normalize_name(name):
+            node = edges[node].get(char) or root.get(char, 0)
+
+            # On ties the earlier match wins, since it was seen first
+            found = best[node]
+            if found and found[0] > best_length:
+                best_length, best_logo = found
+        return best_logo
+
+    def match_url(self, url):
+        """Return the logo of the most specific known domain for a URL's host, or None."""
+        host = normalize_host(url)
+        if not host:
+            return None
+
+        logo = None
+        node = self._domains
+        for label in reversed(host.split('.')):
+            node = node.get(label)
+            if node is None:
+                break
+            logo = node.get('', logo)
+        return logo
+
+    def lookup(self, name, url=None):
+        """Return the catalog logo for a service by name, then by URL, or None."""
+        return self.match_name(name or '') or self.match_url(url)
+
+catalog = LogoCatalog(SERVICE_LOGOS, SERVICE_DOMAINS)
@@ -0,0 +1,247 @@
+"""
+Local proxy for remote logos.
+
+Subscription logos mostly live on CDNs and the services' own websites, and
+linking them directly makes every browser resolve and connect to all of
+those hosts on every page. Templates link remote logos through /logo/<key>
+instead (see logo_src). The key is the logo URL signed with the app's
+secret key, so the proxy only fetches URLs the app itself handed out.
+
+On first use a logo is fetched once, normalized to a small WebP (SVGs are
+kept as they are) and cached on disk; from then on it's served locally
+and browsers may cache it for good. Logos that can't be fetched get a
+generated placeholder until the next attempt.
+"""
+import hashlib
+import ipaddress
+import logging
+import os
+import socket
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+from html import escape
+from urllib.parse import urljoin, urlparse
+import requests
+from flask import url_for
+from itsdangerous import BadSignature, URLSafeSerializer
+from requests.adapters import HTTPAdapter
+from app import app
+from image_pipeline import normalize_logo, write_file
+
+logger = logging.getLogger(__name__)
+
+# Size in px of proxied logos; they are shown at 24px
+PROXY_LOGO_SIZE = 64
+
+# Largest remote logo that is downloaded
+MAX_REMOTE_LOGO_BYTES = 2 * 1024 * 1024
+
+# (connect, read) timeouts in seconds for fetching a remote logo
+REMOTE_LOGO_TIMEOUT = (3.05, 5)
+
+# Redirects followed when fetching a remote logo
+MAX_LOGO_REDIRECTS = 3
+
+# A logo that couldn't be fetched is tried again after this many seconds
+LOGO_RETRY_SECONDS = 600
+
+# Cache names of failed fetches mapped to when they failed, least recently
+# failed first. The oldest are forgotten beyond MAX_FAILED_FETCHES.
+MAX_FAILED_FETCHES = 4096
+_failed_fetches = OrderedDict()
+_failed_fetches_lock = threading.Lock()
+
+# One lock per cache name being fetched, so concurrent requests fetch a logo
+# only once. Locks are removed when their fetch is done.
+_fetch_locks = {}
+_fetch_locks_lock = threading.Lock()
+
+class PublicAddressAdapter(HTTPAdapter):
+    """
+    Logo URLs are user input, so unless LOGO_PROXY_ALLOW_PRIVATE is set the
+    proxy only connects to public addresses, never to internal services.
+
+    The host is resolved and checked when a connection is requested, and the
+    connection goes to the checked address. A second lookup can't return a
+    different (private) address, as in DNS rebinding. The Host header and TLS
+    (SNI and the certificate check) still use the URL's hostname.
+    """
+
+    def build_connection_pool_key_attributes(self, request, verify, cert=None):
+        host_params, pool_kwargs = super().build_connection_pool_key_attributes(request, verify, cert)
+        if app.config['LOGO_PROXY_ALLOW_PRIVATE']:
+            return host_params, pool_kwargs
+
+        hostname = host_params['host']
+        address = _public_address(hostname, host_params['port'])
+        host_params['host'] = f"[{address}]" if ':' in address else address
+        if host_params['scheme'] == 'https':
+            pool_kwargs['server_hostname'] = hostname
+            pool_kwargs['assert_hostname'] = hostname
+        return host_params, pool_kwargs
+
+    def add_headers(self, request, **kwargs):
+        # Connections are opened to the address, so the host has to be named
+        request.headers.setdefault('Host', urlparse(request.url).netloc.rpartition('@')[2])
+
+# Remote logos are fetched on their own pooled session, through the adapter
+logo_session = requests.Session()
+logo_session.mount('https://', PublicAddressAdapter(pool_connections=8, pool_maxsize=8))
+logo_session.mount('http://', PublicAddressAdapter(pool_connections=8, pool_maxsize=8))
+
+def _serializer():
+    return URLSafeSerializer(app.secret_key, salt='logo-proxy')
+
+@lru_cache(maxsize=4096)
+def _logo_key(logo_url):
+    return _serializer().dumps(logo_url)
+
+def logo_src(logo_url, name=None):
+    """
+    Return the URL a page should load a logo from: remote logos go through
+    the logo proxy, uploaded logos are returned unchanged. The name's
+    initial is used for the placeholder.
+    """
+    if not logo_url or not logo_url.startswith(('http://', 'https://')):
+        return logo_url
+    initial = name.strip()[:1].upper() if name and name.strip() else None
+    return url_for('logo', key=_logo_key(logo_url), initial=initial)
+
+def logo_url_for_key(key):
+    """Return the logo URL signed into a proxy key, or None for an invalid key."""
+    try:
+        logo_url = _serializer().loads(key)
+    except BadSignature:
+        return None
+    return logo_url if isinstance(logo_url, str) else None
+
+def _cache_name(logo_url):
+    return hashlib.sha256(logo_url.encode('utf-8')).hexdigest()
+
+def cached_logo_path(logo_url):
+    """Return the path of a logo in the disk cache, or None if it isn't cached."""
+    name = _cache_name(logo_url)
+    for extension in ('webp', 'svg'):
+        path = os.path.join(app.config['LOGO_CACHE_FOLDER'], f"{name}.{extension}")
+        if os.path.exists(path):
+            return path
+    return None
+
+def _is_public(address):
+    return ipaddress.ip_address(address).is_global
+
+def _public_address(hostname, port):
+    """Return the address to connect to for a host. Raises ValueError if any of its addresses isn't public."""
+    addresses = [
+        info[4][0].split('%', 1)[0]
+        for info in socket.getaddrinfo(hostname, port, proto=socket.IPPROTO_TCP)
+    ]
+    if not addresses or not all(_is_public(address) for address in addresses):
+        raise ValueError(f"{hostname} is not a public address")
+    return addresses[0]
+
+def _download(logo_url):
+    """Fetch a remote logo. Returns (bytes, content type)."""
+    url = logo_url
+    for _ in range(MAX_LOGO_REDIRECTS + 1):
+        # Redirects are followed here so every hop's host is checked
+        if urlparse(url).scheme not in ('http', 'https'):
+            raise ValueError("not an http(s) URL")
+        response = logo_session.get(url, timeout=REMOTE_LOGO_TIMEOUT, stream=True, allow_redirects=False)
+        if not response.is_redirect:
+            break
+        url = urljoin(url, response.headers['Location'])
+        response.close()
+    
+    with response:
+        if response.status_code != 200:
+            raise ValueError(f"status {response.status_code}")
+        data = bytearray()
+        for block in response.iter_content(64 * 1024):
+            data.extend(block)
+            if len(data) > MAX_REMOTE_LOGO_BYTES:
+                raise ValueError(f"larger than {MAX_REMOTE_LOGO_BYTES} bytes")
+        return bytes(data), response.headers.get('Content-Type', '')
+
+def _failed_recently(name):
+    with _failed_fetches_lock:
+        failed_at = _failed_fetches.get(name)
+        if failed_at is None:
+            return False
+        if time.monotonic() - failed_at < LOGO_RETRY_SECONDS:
+            return True
+        del _failed_fetches[name]
+        return False
+
+def fetch_failed_recently(logo_url):
+    """Return True if fetching a remote logo failed and it isn't tried again yet."""
+    return _failed_recently(_cache_name(logo_url))
+
+def _record_failure(name):
+    with _failed_fetches_lock:
+        _failed_fetches[name] = time.monotonic()
+        _failed_fetches.move_to_end(name)
+        while len(_failed_fetches) > MAX_FAILED_FETCHES:
+            _failed_fetches.popitem(last=False)
+
+def fetch_logo(logo_url):
+    """
+    Return the disk cache path of a remote logo, fetching and normalizing it
+    on first use. Returns None if the logo can't be fetched right now.
+    """
+    path = cached_logo_path(logo_url)
+    if path:
+        return path
+
+    name = _cache_name(logo_url)
+    if _failed_recently(name):
+        return None
+
+    with _fetch_locks_lock:
+        lock = _fetch_locks.setdefault(name, threading.Lock())
+    with lock:
+        try:
+            return _fetch_and_cache(logo_url, name)
+        finally:
+            # Requests still waiting on this lock find the result on disk (or
+            # the failure) once they get it, so it can be dropped already
+            with _fetch_locks_lock:
+                if _fetch_locks.get(name) is lock:
+                    del _fetch_locks[name]
+
+def _fetch_and_cache(logo_url, name):
+    # Another request may have fetched it (or failed to) while we waited
+    path = cached_logo_path(logo_url)
+    if path or _failed_recently(name):
+        return path
+
+    try:
+        data, content_type = _download(logo_url)
+        if 'svg' in content_type and data.lstrip()[:5] in (b'<svg ', b'<?xml'):
+            extension = 'svg'
+        else:
+            data, extension = normalize_logo(data, PROXY_LOGO_SIZE), 'webp'
+    except Exception as e:
+        logger.warning(f"Could not fetch logo {logo_url}: {str(e)}")
+        _record_failure(name)
+        return None
+
+    folder = app.config['LOGO_CACHE_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{name}.{extension}")
+    write_file(path, data)
+    return path
+
+def placeholder_svg(key, initial=None):
+    """A generated placeholder logo: the initial on a background colored by the key."""
+    hue = zlib.crc32(key.encode('utf-8')) % 360
+    letter = escape(initial[:1]) if initial else ''
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{PROXY_LOGO_SIZE}" height="{PROXY_LOGO_SIZE}" viewBox="0 0 64 64">'
+        f'<rect width="64" height="64" rx="12" fill="hsl({hue},45%,55%)"/>'
+        f'<text x="32" y="42" font-family="sans-serif" font-size="30" font-weight="bold" '
+        f'fill="#fff" text-anchor="middle">{letter}</text></svg>'
+    )
@@ -0,0 +1,159 @@
+"""
+Batched delivery of payment reminder emails.
+
+A batch is rendered by a small thread pool while the main thread sends the
+finished messages over a single SMTP connection. Transient SMTP failures are
+retried with exponential backoff, reconnecting when the server drops us.
+"""
+import logging
+import smtplib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask_mail import Message
+from app import app, mail
+from utils import format_currency
+
+logger = logging.getLogger(__name__)
+
+REMINDER_TEMPLATE = 'email/payment_reminder.html'
+
+# Number of threads rendering emails while the previous ones are being sent
+RENDER_WORKERS = 4
+
+# Attempts per message and the delay before the first retry (doubled each time)
+MAX_SEND_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 1.0
+
+# Errors after which the connection is unusable and has to be reopened
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+def _is_transient(error):
+    """Return True if an SMTP error is worth retrying (connection drops and 4xx replies)."""
+    if isinstance(error, CONNECTION_ERRORS):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    return False
+
+def _build_message(template, user, subscription, days_until_payment):
+    """
+    Render one reminder email. Runs in a worker thread.
+    Returns (message, None) or (None, error) so one bad render doesn't stop the batch.
+    """
+    try:
+        with app.app_context():
+            msg = Message(
+                subject=f"Reminder: {subscription.name} payment due in {days_until_payment} days",
+                recipients=[user.email]
+            )
+            msg.html = template.render(
+                user=user,
+                subscription=subscription,
+                days_until_payment=days_until_payment,
+                amount=format_currency(subscription.amount, subscription.currency)
+            )
+            return msg, None
+    except Exception as e:
+        return None, e
+
+def _reconnect(connection):
+    """Replace a broken SMTP connection with a fresh one."""
+    try:
+        if connection.host is not None:
+            connection.host.close()
+    finally:
+        connection.host = connection.configure_host()
+
+def _send_with_retry(connection, msg):
+    """Send one message, retrying transient failures. Raises the last error on failure."""
+    delay = RETRY_BACKOFF_SECONDS
+    for attempt in range(1, MAX_SEND_ATTEMPTS + 1):
+        try:
+            connection.send(msg)
+            return
+        except Exception as e:
+            if not _is_transient(e) or attempt == MAX_SEND_ATTEMPTS:
+                raise
+            logger.warning(f"Transient error sending to {msg.recipients}, retrying in {delay:.1f}s: {str(e)}")
+            time.sleep(delay)
+            delay *= 2
+            if isinstance(e, CONNECTION_ERRORS):
+                _reconnect(connection)
+
+def deliver_reminder_emails(deliveries):
+    """
+    Send a batch of reminder emails over one SMTP connection.
+
+    `deliveries` is a list of (user, subscription, days_until_payment) tuples.
+    Must be called inside an application context.
+
+    Returns a dict of batch statistics. `retry_later` lists the indexes of
+    deliveries that could not be rendered or still failed with a transient
+    error and should be tried again on the next run; messages the server
+    rejected permanently are only counted in `failed`.
+    """
+    stats = {
+        'sent': 0,
+        'failed': 0,
+        'retry_later': [],
+        'seconds': 0.0,
+        'per_second': 0.0,
+        'avg_latency_ms': 0.0,
+        'max_latency_ms': 0.0,
+    }
+    if not deliveries:
+        return stats
+
+    started = time.monotonic()
+    latencies = []
+
+    # Compile the template once and share it between the render workers
+    template = app.jinja_env.get_template(REMINDER_TEMPLATE)
+
+    try:
+        with ThreadPoolExecutor(max_workers=RENDER_WORKERS) as pool, mail.connect() as connection:
+            # Messages are sent in order as soon as each one is rendered
+            rendered = pool.map(lambda delivery: _build_message(template, *delivery), deliveries)
+
+            for index, (msg, render_error) in enumerate(rendered):
+                if render_error is not None:
+                    # Rendering fails on bad configuration (e.g. no SERVER_NAME for
+                    # the links) rather than on the message, so don't drop it
+                    stats['failed'] += 1
+                    stats['retry_later'].append(index)
+                    logger.error(f"Failed to render reminder email: {str(render_error)}")
+                    continue
+
+                send_started = time.monotonic()
+                try:
+                    _send_with_retry(connection, msg)
+                    stats['sent'] += 1
+                except Exception as e:
+                    stats['failed'] += 1
+                    if _is_transient(e):
+                        stats['retry_later'].append(index)
+                    logger.error(f"Failed to send reminder email to {msg.recipients}: {str(e)}")
+                latencies.append(time.monotonic() - send_started)
+    except Exception as e:
+        # The SMTP connection could not be (re)opened: retry the rest later
+        handled = stats['sent'] + stats['failed']
+        stats['failed'] += len(deliveries) - handled
+        stats['retry_later'].extend(range(handled, len(deliveries)))
+        logger.error(f"Reminder email batch aborted after {handled} messages: {str(e)}")
+
+    stats['seconds'] = time.monotonic() - started
+    if stats['seconds'] > 0:
+        stats['per_second'] = stats['sent'] / stats['seconds']
+    if latencies:
+        stats['avg_latency_ms'] = sum(latencies) / len(latencies) * 1000
+        stats['max_latency_ms'] = max(latencies) * 1000
+
+    logger.info(
+        f"Reminder email batch: {stats['sent']} sent, {stats['failed']} failed "
+        f"({len(stats['retry_later'])} to retry) in {stats['seconds']:.2f}s, "
+        f"{stats['per_second']:.1f} msg/s, avg latency {stats['avg_latency_ms']:.0f} ms, "
+        f"max {stats['max_latency_ms']:.0f} ms"
+    )
+    return stats
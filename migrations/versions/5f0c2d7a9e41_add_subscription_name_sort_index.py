@@ -0,0 +1,30 @@
+"""Add index for subscription list pages sorted by name
+
+Revision ID: 5f0c2d7a9e41
+Revises: 2c94dafffeb8
+Create Date: 2026-10-18 17:21:43.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f0c2d7a9e41'
+down_revision = '2c94dafffeb8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Expression indexes aren't picked up by autogenerate
+    op.create_index(
+        'ix_subscription_user_id_lower_name_id',
+        'subscription',
+        ['user_id', sa.text('lower(name)'), 'id'],
+        unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('ix_subscription_user_id_lower_name_id', table_name='subscription')
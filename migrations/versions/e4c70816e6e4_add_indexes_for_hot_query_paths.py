@@ -0,0 +1,52 @@
+"""Add indexes for hot query paths and unique exchange rate pairs
+
+Revision ID: e4c70816e6e4
+Revises: a8e8d1628189
+Create Date: 2026-10-18 10:03:41.208915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4c70816e6e4'
+down_revision = 'a8e8d1628189'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Older versions inserted a new row for a pair on every default-rate
+    # fallback. Keep only the newest row per pair before adding the constraint.
+    op.execute(
+        """
+        DELETE FROM exchange_rate older
+        USING exchange_rate newer
+        WHERE older.base_currency = newer.base_currency
+          AND older.target_currency = newer.target_currency
+          AND older.id < newer.id
+        """
+    )
+
+    with op.batch_alter_table('exchange_rate', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_exchange_rate_base_currency_target_currency', ['base_currency', 'target_currency'])
+
+    with op.batch_alter_table('reminder', schema=None) as batch_op:
+        batch_op.create_index('ix_reminder_subscription_id', ['subscription_id'], unique=False)
+        batch_op.create_index('ix_reminder_unsent_subscription_id', ['subscription_id'], unique=False, postgresql_where=sa.text('NOT is_sent'))
+
+    with op.batch_alter_table('subscription', schema=None) as batch_op:
+        batch_op.create_index('ix_subscription_user_id_is_active_next_payment_date', ['user_id', 'is_active', 'next_payment_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('subscription', schema=None) as batch_op:
+        batch_op.drop_index('ix_subscription_user_id_is_active_next_payment_date')
+
+    with op.batch_alter_table('reminder', schema=None) as batch_op:
+        batch_op.drop_index('ix_reminder_unsent_subscription_id', postgresql_where=sa.text('NOT is_sent'))
+        batch_op.drop_index('ix_reminder_subscription_id')
+
+    with op.batch_alter_table('exchange_rate', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_exchange_rate_base_currency_target_currency', type_='unique')
@@ -1,7 +1,9 @@
-from datetime import datetime, timedelta
+import uuid
+from datetime import datetime
 from app import db, login_manager
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from recurrence import next_occurrence
 
 @login_manager.user_loader
 def load_user(id):
@@ -39,48 +41,33 @@ class Subscription(db.Model):
     currency = db.Column(db.String(3), default="USD")
     billing_cycle = db.Column(db.String(20), nullable=False)  # weekly, monthly, quarterly, bi-annually, yearly, lifetime
     start_date = db.Column(db.DateTime, default=datetime.utcnow)
-    next_payment_date = db.Column(db.DateTime)
+    next_payment_date = db.Column(db.DateTime, index=True)
     notes = db.Column(db.Text)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    # Relationships
-    reminders = db.relationship('Reminder', backref='subscription', lazy='dynamic', cascade='all, delete-orphan')
+    # Relationships. A plain list (not a dynamic query) so it can be
+    # eager-loaded for many subscriptions at once, e.g. by the CSV export.
+    reminders = db.relationship('Reminder', backref='subscription', lazy='select', cascade='all, delete-orphan')
+    
+    __table_args__ = (
+        # Dashboard, reports and reminders filter by user, active flag and payment date
+        db.Index('ix_subscription_user_id_is_active_next_payment_date', 'user_id', 'is_active', 'next_payment_date'),
+        # Subscription list pages, sorted by name (see subscription_list.py)
+        db.Index('ix_subscription_user_id_lower_name_id', user_id, db.func.lower(name), id),
+    )
     
     def calculate_next_payment_date(self):
         if self.billing_cycle == 'lifetime':
             return None
         
-        if not self.next_payment_date or self.next_payment_date < datetime.utcnow():
-            # Start from the start_date
-            start = self.start_date
-            
-            # Calculate how many billing cycles have passed
-            days_passed = (datetime.utcnow() - start).days
-            
-            if self.billing_cycle == 'weekly':
-                weeks_passed = days_passed // 7
-                self.next_payment_date = start + timedelta(days=(weeks_passed + 1) * 7)
-            elif self.billing_cycle == 'monthly':
-                # Simple approximation for months
-                months_passed = days_passed // 30
-                new_month = ((start.month - 1 + months_passed + 1) % 12) + 1
-                new_year = start.year + ((start.month - 1 + months_passed + 1) // 12)
-                self.next_payment_date = datetime(new_year, new_month, min(start.day, 28))
-            elif self.billing_cycle == 'quarterly':
-                quarters_passed = days_passed // 90
-                new_month = ((start.month - 1 + (quarters_passed + 1) * 3) % 12) + 1
-                new_year = start.year + ((start.month - 1 + (quarters_passed + 1) * 3) // 12)
-                self.next_payment_date = datetime(new_year, new_month, min(start.day, 28))
-            elif self.billing_cycle == 'bi-annually':
-                half_years_passed = days_passed // 182
-                new_month = ((start.month - 1 + (half_years_passed + 1) * 6) % 12) + 1
-                new_year = start.year + ((start.month - 1 + (half_years_passed + 1) * 6) // 12)
-                self.next_payment_date = datetime(new_year, new_month, min(start.day, 28))
-            elif self.billing_cycle == 'yearly':
-                years_passed = days_passed // 365
-                self.next_payment_date = datetime(start.year + years_passed + 1, start.month, min(start.day, 28))
+        now = datetime.utcnow()
+        if not self.next_payment_date or self.next_payment_date < now:
+            # Count billing cycles from the start_date on the real calendar
+            next_payment_date = next_occurrence(self.start_date or now, self.billing_cycle, now)
+            if next_payment_date:
+                self.next_payment_date = next_payment_date
         
         return self.next_payment_date
     
@@ -95,8 +82,15 @@ class Reminder(db.Model):
     email_notification = db.Column(db.Boolean, default=True)
     push_notification = db.Column(db.Boolean, default=False)
     is_sent = db.Column(db.Boolean, default=False)
+    sent_for_payment_date = db.Column(db.DateTime)  # Payment date the reminder was last sent for
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_reminder_subscription_id', 'subscription_id'),
+        # The reminder job only ever looks at reminders that haven't been sent
+        db.Index('ix_reminder_unsent_subscription_id', 'subscription_id', postgresql_where=db.text('NOT is_sent')),
+    )
+    
     def __repr__(self):
         return f'<Reminder for Subscription {self.subscription_id} ({self.days_before} days before)>'
 
@@ -107,5 +101,72 @@ class ExchangeRate(db.Model):
     rate = db.Column(db.Float, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # One row per currency pair, so rate refreshes can upsert safely
+        db.UniqueConstraint('base_currency', 'target_currency', name='uq_exchange_rate_base_currency_target_currency'),
+    )
+    
     def __repr__(self):
         return f'<ExchangeRate {self.base_currency} to {self.target_currency}: {self.rate}>'
+
+class ExchangeRateHistory(db.Model):
+    # Append-only daily rates, stored only against the API's base currency.
+    # Cross rates for any pair are derived from two rows of the same day.
+    base_currency = db.Column(db.String(3), primary_key=True)
+    target_currency = db.Column(db.String(3), primary_key=True)
+    rate_date = db.Column(db.Date, primary_key=True)
+    rate = db.Column(db.Float, nullable=False)
+    
+    def __repr__(self):
+        return f'<ExchangeRateHistory {self.base_currency} to {self.target_currency} on {self.rate_date}: {self.rate}>'
+
+class FaviconCache(db.Model):
+    # Result of probing a website for a favicon. favicon_url is NULL when no
+    # direct favicon answered, so failed probes are cached as well.
+    domain = db.Column(db.String(255), primary_key=True)
+    favicon_url = db.Column(db.String(255))
+    checked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<FaviconCache {self.domain}: {self.favicon_url}>'
+
+class StoredLogo(db.Model):
+    # An uploaded logo in static/uploads, named after the SHA-256 of the
+    # uploaded file so identical uploads share one set of files. ref_count
+    # is the number of subscriptions using it; the files are deleted when
+    # it drops to zero.
+    key = db.Column(db.String(64), primary_key=True)
+    extension = db.Column(db.String(8), nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<StoredLogo {self.key}.{self.extension} ({self.ref_count} refs)>'
+
+class ImportJob(db.Model):
+    # A CSV import running in the background. rows_processed is committed
+    # together with each chunk of imported rows, so an interrupted job can
+    # resume after the last committed chunk.
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    filename = db.Column(db.String(255))
+    file_path = db.Column(db.String(512), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, completed, failed
+    rows_processed = db.Column(db.Integer, nullable=False, default=0)
+    created_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_count = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def rows_per_second(self):
+        end = self.finished_at or self.heartbeat_at
+        if not self.started_at or not end or end <= self.started_at:
+            return 0.0
+        return self.rows_processed / (end - self.started_at).total_seconds()
+    
+    def __repr__(self):
+        return f'<ImportJob {self.id} {self.status}>'
@@ -0,0 +1,98 @@
+"""
+Calendar-exact billing recurrence.
+
+Every payment date is computed directly from the subscription's start date,
+so month-end start dates stay anchored (Jan 31 -> Feb 29 -> Mar 31) instead
+of drifting. The same rules are available as a Python function for single
+subscriptions and as a SQL expression for bulk updates.
+"""
+import calendar
+from datetime import datetime, timedelta
+from sqlalchemy import DateTime, Integer, case, cast, extract, func, literal
+
+# Number of calendar months between payments for month-based cycles
+CYCLE_MONTHS = {
+    'monthly': 1,
+    'quarterly': 3,
+    'bi-annually': 6,
+    'yearly': 12,
+}
+
+WEEK = timedelta(days=7)
+
+def add_months(start, months):
+    """Return start shifted by a number of months, clamping the day to the month's end."""
+    month_index = start.month - 1 + months
+    year = start.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(start.day, calendar.monthrange(year, month)[1])
+    return start.replace(year=year, month=month, day=day)
+
+def next_occurrence(start, billing_cycle, after=None):
+    """
+    Return the first payment date strictly after `after` for a subscription
+    that started on `start`. Payments happen on the start date and then once
+    per billing cycle. Returns None for lifetime and unknown cycles.
+    """
+    if after is None:
+        after = datetime.utcnow()
+
+    if billing_cycle != 'weekly' and billing_cycle not in CYCLE_MONTHS:
+        return None
+
+    # The first payment is the start date itself
+    if start > after:
+        return start
+
+    if billing_cycle == 'weekly':
+        weeks_passed = (after - start) // WEEK
+        return start + (weeks_passed + 1) * WEEK
+
+    step = CYCLE_MONTHS[billing_cycle]
+    months_passed = (after.year - start.year) * 12 + (after.month - start.month)
+    candidate = add_months(start, months_passed // step * step)
+    if candidate <= after:
+        candidate = add_months(start, (months_passed // step + 1) * step)
+    return candidate
+
+def payment_dates(start, billing_cycle, since, until):
+    """Yield the payment dates strictly after `since` and up to `until`, oldest first."""
+    payment = next_occurrence(start, billing_cycle, since)
+    while payment is not None and payment <= until:
+        yield payment
+        payment = next_occurrence(start, billing_cycle, payment)
+
+def next_occurrence_sql(start_column, cycle_column, after):
+    """
+    Build a PostgreSQL expression equivalent to next_occurrence() so next
+    payment dates can be recomputed for many rows in one UPDATE.
+    PostgreSQL clamps `timestamp + interval 'N months'` to the month's end,
+    which matches add_months().
+    """
+    after_value = literal(after, DateTime)
+
+    # Weekly: whole weeks elapsed since the start, plus one
+    weeks_passed = cast(
+        func.floor(extract('epoch', after_value - start_column) / WEEK.total_seconds()),
+        Integer
+    )
+    next_weekly = start_column + func.make_interval(0, 0, weeks_passed + 1)
+
+    # Month-based: whole cycles elapsed by calendar month, then step past `after`
+    step = case(CYCLE_MONTHS, value=cycle_column)
+    months_passed = (
+        (after.year * 12 + after.month)
+        - (extract('year', start_column) * 12 + extract('month', start_column))
+    )
+    periods = cast(func.floor(months_passed / step), Integer)
+    candidate = start_column + func.make_interval(0, periods * step)
+    next_monthly = case(
+        (candidate > after_value, candidate),
+        else_=start_column + func.make_interval(0, (periods + 1) * step)
+    )
+
+    return case(
+        (start_column > after_value, start_column),
+        (cycle_column == 'weekly', next_weekly),
+        else_=next_monthly
+    )
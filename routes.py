@@ -1,15 +1,21 @@
-import os
 import csv
+import hashlib
 import io
 import logging
-from datetime import datetime, timedelta
-from flask import render_template, flash, redirect, url_for, request, jsonify, send_file
+from datetime import datetime, timedelta, timezone
+from flask import render_template, flash, redirect, url_for, request, jsonify, Response, stream_with_context, abort, send_file
 from flask_login import login_user, logout_user, login_required, current_user
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 from werkzeug.urls import urlsplit
 from app import app, db
-from models import User, Subscription, Reminder, ExchangeRate
-from utils import convert_currency, fetch_exchange_rates, send_reminder_email
-import pandas as pd
+from models import User, Subscription, Reminder, ImportJob
+from utils import convert_currency, fetch_exchange_rates, get_rates_as_of, get_rate_matrix_updated_at, handle_image_upload, release_logo, STORED_LOGO_URL
+
+logger = logging.getLogger(__name__)
+
+# Shown when handle_image_upload turns a logo down
+LOGO_UPLOAD_ERROR = 'The logo could not be uploaded. Use a PNG, JPG, GIF, WebP or SVG image of up to 10 MB.'
 
 # Default subscriptions to populate
 DEFAULT_SUBSCRIPTIONS = [
@@ -32,6 +38,27 @@ DEFAULT_SUBSCRIPTIONS = [
     {"name": "YouTube Premium", "url": "https://www.youtube.com/premium"}
 ]
 
+# DEFAULT_SUBSCRIPTIONS with their logo URLs, and when they are resolved again
+_suggested_subscriptions = None
+_suggested_subscriptions_expire_at = None
+
+def get_suggested_subscriptions():
+    """
+    Return the suggested subscriptions with logo URLs. They are resolved on
+    first use and again once the shortest favicon TTL has passed, so a
+    website that didn't answer gets its own favicon when it's probed again.
+    """
+    global _suggested_subscriptions, _suggested_subscriptions_expire_at
+    now = datetime.utcnow()
+    if _suggested_subscriptions is None or _suggested_subscriptions_expire_at <= now:
+        from utils import FAVICON_NEGATIVE_TTL, get_logo_url_for_service
+        _suggested_subscriptions = [
+            dict(sub, logo_url=get_logo_url_for_service(sub['name'], sub['url']))
+            for sub in DEFAULT_SUBSCRIPTIONS
+        ]
+        _suggested_subscriptions_expire_at = now + FAVICON_NEGATIVE_TTL
+    return _suggested_subscriptions
+
 # Home page
 @app.route('/')
 def index():
@@ -114,11 +141,13 @@ def logout():
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    subscriptions = Subscription.query.filter_by(user_id=current_user.id).all()
+    # Imported here so pandas is only loaded once costs are first needed
+    from cost_engine import BILLING_CYCLES, compute_grouped_costs
+    from logo_bundle import logo_bundle_url
     
-    # Calculate next payment date for each subscription
-    for sub in subscriptions:
-        sub.calculate_next_payment_date()
+    # Rendering is read-only: overdue payment dates are rolled forward by the
+    # scheduler and recomputed when a subscription is saved, not on every view.
+    # The subscriptions table loads its rows page by page from /api/subscriptions.
     
     # Get upcoming payments
     upcoming_payments = Subscription.query.filter(
@@ -128,49 +157,23 @@ def dashboard():
         Subscription.is_active == True
     ).order_by(Subscription.next_payment_date).limit(5).all()
     
-    # Get monthly spending
-    monthly_spending = 0
-    for sub in subscriptions:
-        if sub.is_active and sub.billing_cycle != 'lifetime':
-            amount_in_preferred = convert_currency(
-                sub.amount,
-                sub.currency,
-                current_user.preferred_currency
-            )
-            
-            if sub.billing_cycle == 'weekly':
-                monthly_spending += amount_in_preferred * 4.33  # Average weeks in a month
-            elif sub.billing_cycle == 'monthly':
-                monthly_spending += amount_in_preferred
-            elif sub.billing_cycle == 'quarterly':
-                monthly_spending += amount_in_preferred / 3
-            elif sub.billing_cycle == 'bi-annually':
-                monthly_spending += amount_in_preferred / 6
-            elif sub.billing_cycle == 'yearly':
-                monthly_spending += amount_in_preferred / 12
-    
-    # Total number of subscriptions
-    total_subscriptions = len(subscriptions)
-    active_subscriptions = sum(1 for sub in subscriptions if sub.is_active)
-    
-    # Get subscription counts by billing cycle for chart
-    billing_cycles = ['weekly', 'monthly', 'quarterly', 'bi-annually', 'yearly', 'lifetime']
-    cycle_counts = {}
-    for cycle in billing_cycles:
-        cycle_counts[cycle] = sum(1 for sub in subscriptions if sub.billing_cycle == cycle and sub.is_active)
+    # Get monthly spending and counts by billing cycle for chart.
+    # These are aggregated in the database, so no subscriptions are loaded.
+    costs = compute_grouped_costs(current_user.id, current_user.preferred_currency)
     
     # Pass current time to template
     current_datetime = datetime.now()
     
     return render_template(
         'dashboard.html',
-        subscriptions=subscriptions,
         upcoming_payments=upcoming_payments,
-        monthly_spending=monthly_spending,
-        total_subscriptions=total_subscriptions,
-        active_subscriptions=active_subscriptions,
-        cycle_counts=cycle_counts,
-        current_datetime=current_datetime
+        monthly_spending=costs['monthly_total'],
+        total_subscriptions=costs['total_subscriptions'],
+        active_subscriptions=costs['active_subscriptions'],
+        cycle_counts=costs['cycle_counts'],
+        billing_cycles=BILLING_CYCLES,
+        current_datetime=current_datetime,
+        logo_bundle_url=logo_bundle_url(current_user.id)
     )
 
 # Subscription management
@@ -187,23 +190,10 @@ def add_subscription():
         notes = request.form.get('notes')
         enable_reminders = 'enable_reminders' in request.form
 
-        # Handle logo upload
-        logo_url = None
-        used_temp_id = False
-        temp_logo_url = None
-
-        if 'logo' in request.files:
-            logo_file = request.files['logo']
-            if logo_file and logo_file.filename:
-                logo_url = handle_image_upload(logo_file, current_user.id)
-                used_temp_id = True
-                temp_logo_url = logo_url
-
         subscription = Subscription(
             user_id=current_user.id,
             name=name,
             url=url,
-            logo_url=logo_url,
             amount=amount,
             currency=currency,
             billing_cycle=billing_cycle,
@@ -217,30 +207,12 @@ def add_subscription():
         db.session.add(subscription)
         db.session.commit()
         
-        # If we used a temporary ID for the logo upload, we need to rename the file
-        # with the actual subscription ID and update the logo_url
-        if used_temp_id and temp_logo_url:
-            import os
-            from utils import handle_image_upload
-            
-            # Get the original file path
-            temp_file_path = temp_logo_url[1:]  # Remove leading slash
-            
-            if os.path.exists(temp_file_path):
-                # Get file extension
-                extension = os.path.splitext(temp_file_path)[1]
-                
-                # Create new filename with actual subscription ID
-                new_filename = f"{subscription.id}_{os.path.basename(temp_file_path).split('_', 1)[1]}"
-                new_path = os.path.join('static', 'uploads', new_filename)
-                
-                # Rename file
-                try:
-                    os.rename(temp_file_path, new_path)
-                    subscription.logo_url = f"/{new_path}"
-                    db.session.commit()
-                except Exception as e:
-                    logging.error(f"Error renaming temp logo file: {str(e)}")
+        # Handle logo upload. The image is processed in the background
+        # and set as the subscription's logo when it's ready.
+        if 'logo' in request.files:
+            logo_file = request.files['logo']
+            if logo_file and logo_file.filename and not handle_image_upload(logo_file, subscription.id):
+                flash(LOGO_UPLOAD_ERROR, 'warning')
         
         # Create reminders only if enabled
         if enable_reminders and subscription.billing_cycle != 'lifetime':
@@ -252,13 +224,8 @@ def add_subscription():
         flash('Subscription added successfully', 'success')
         return redirect(url_for('dashboard'))
     
-    # Get suggested subscriptions
-    suggested_subscriptions = DEFAULT_SUBSCRIPTIONS.copy()
-    
-    # Add logo URLs to suggested subscriptions
-    from utils import get_logo_url_for_service
-    for sub in suggested_subscriptions:
-        sub['logo_url'] = get_logo_url_for_service(sub['name'], sub['url'])
+    # Get suggested subscriptions with their logos
+    suggested_subscriptions = get_suggested_subscriptions()
     
     # Pass today's date for the start_date field
     today = datetime.now().strftime('%Y-%m-%d')
@@ -274,6 +241,8 @@ def edit_subscription(id):
     reminders = Reminder.query.filter_by(subscription_id=id).all()
     
     if request.method == 'POST':
+        previous_schedule = (subscription.start_date, subscription.billing_cycle)
+        
         subscription.name = request.form.get('name')
         subscription.url = request.form.get('url')
         subscription.amount = float(request.form.get('amount', 0))
@@ -283,28 +252,24 @@ def edit_subscription(id):
         subscription.notes = request.form.get('notes')
         subscription.is_active = 'is_active' in request.form
         enable_reminders = 'enable_reminders' in request.form
+        
+        # Recompute the next payment date if the schedule changed
+        if (subscription.start_date, subscription.billing_cycle) != previous_schedule:
+            subscription.next_payment_date = None
+            subscription.calculate_next_payment_date()
 
-        # Handle logo upload
+        # Handle logo upload. The old logo is replaced once the new
+        # image has been processed in the background.
         if 'logo' in request.files:
             logo_file = request.files['logo']
-            if logo_file and logo_file.filename:
-                # Delete old logo if exists
-                if subscription.logo_url:
-                    try:
-                        os.remove(subscription.logo_url[1:])  # Remove leading slash
-                    except Exception as e:
-                        logging.error(f"Error deleting old logo: {str(e)}")
-                
-                # Upload new logo
-                subscription.logo_url = handle_image_upload(logo_file, current_user.id)
+            if logo_file and logo_file.filename and not handle_image_upload(logo_file, subscription.id):
+                flash(LOGO_UPLOAD_ERROR, 'warning')
 
-        # Handle logo removal
+        # Handle logo removal. The logo's files are released after the commit.
+        removed_logo_url = None
         if 'remove_logo' in request.form and subscription.logo_url:
-            try:
-                os.remove(subscription.logo_url[1:])  # Remove leading slash
-                subscription.logo_url = None
-            except Exception as e:
-                logging.error(f"Error deleting logo: {str(e)}")
+            removed_logo_url = subscription.logo_url
+            subscription.logo_url = None
 
         # Handle reminders
         if enable_reminders:
@@ -335,6 +300,13 @@ def edit_subscription(id):
                 db.session.delete(reminder)
         
         db.session.commit()
+        
+        if removed_logo_url:
+            try:
+                release_logo(removed_logo_url)
+            except Exception as e:
+                logging.error(f"Error deleting logo: {str(e)}")
+        
         flash('Subscription updated successfully', 'success')
         return redirect(url_for('dashboard'))
     
@@ -345,9 +317,15 @@ def edit_subscription(id):
 def delete_subscription(id):
     subscription = Subscription.query.filter_by(id=id, user_id=current_user.id).first_or_404()
     
+    logo_url = subscription.logo_url
     db.session.delete(subscription)
     db.session.commit()
     
+    try:
+        release_logo(logo_url)
+    except Exception as e:
+        logging.error(f"Error deleting logo: {str(e)}")
+    
     flash('Subscription deleted successfully', 'success')
     return redirect(url_for('dashboard'))
 
@@ -391,53 +369,12 @@ def manage_reminders(subscription_id):
 @app.route('/reports')
 @login_required
 def reports():
-    subscriptions = Subscription.query.filter_by(user_id=current_user.id).all()
-    
-    # Calculate monthly spending by category
-    billing_cycles = ['weekly', 'monthly', 'quarterly', 'bi-annually', 'yearly']
-    spending_by_cycle = {cycle: 0 for cycle in billing_cycles}
-    
-    # Add converted amounts to each subscription for display in the template
-    for sub in subscriptions:
-        # Add the amount in user's preferred currency as a property
-        sub.amount_in_preferred = convert_currency(
-            sub.amount,
-            sub.currency,
-            current_user.preferred_currency
-        )
-        
-        # Calculate monthly and yearly costs in preferred currency
-        if sub.billing_cycle == 'weekly':
-            sub.monthly_cost = sub.amount_in_preferred * 4.33  # Average weeks in a month
-            sub.yearly_cost = sub.amount_in_preferred * 52
-        elif sub.billing_cycle == 'monthly':
-            sub.monthly_cost = sub.amount_in_preferred
-            sub.yearly_cost = sub.amount_in_preferred * 12
-        elif sub.billing_cycle == 'quarterly':
-            sub.monthly_cost = sub.amount_in_preferred / 3
-            sub.yearly_cost = sub.amount_in_preferred * 4
-        elif sub.billing_cycle == 'bi-annually':
-            sub.monthly_cost = sub.amount_in_preferred / 6
-            sub.yearly_cost = sub.amount_in_preferred * 2
-        elif sub.billing_cycle == 'yearly':
-            sub.monthly_cost = sub.amount_in_preferred / 12
-            sub.yearly_cost = sub.amount_in_preferred
-        else:  # lifetime
-            sub.monthly_cost = 0
-            sub.yearly_cost = 0
-        
-        # Update spending by cycle for the chart
-        if sub.is_active and sub.billing_cycle != 'lifetime':
-            if sub.billing_cycle == 'weekly':
-                spending_by_cycle['weekly'] += sub.monthly_cost
-            elif sub.billing_cycle == 'monthly':
-                spending_by_cycle['monthly'] += sub.monthly_cost
-            elif sub.billing_cycle == 'quarterly':
-                spending_by_cycle['quarterly'] += sub.monthly_cost
-            elif sub.billing_cycle == 'bi-annually':
-                spending_by_cycle['bi-annually'] += sub.monthly_cost
-            elif sub.billing_cycle == 'yearly':
-                spending_by_cycle['yearly'] += sub.monthly_cost
+    from cost_engine import BILLING_CYCLES, compute_grouped_costs, compute_past_spending
+    from logo_bundle import logo_bundle_url
+    
+    # Monthly and yearly totals in preferred currency, aggregated in the
+    # database. The subscriptions table loads its rows from /api/subscriptions.
+    costs = compute_grouped_costs(current_user.id, current_user.preferred_currency)
     
     # Get upcoming payments in the next 30 days
     now = datetime.utcnow()
@@ -450,76 +387,110 @@ def reports():
         Subscription.is_active == True
     ).order_by(Subscription.next_payment_date).all()
     
-    # Also add converted amounts to upcoming payments
+    # Convert each upcoming payment at the rate in effect on its payment date
+    rates = get_rates_as_of(
+        {payment.currency for payment in upcoming_payments},
+        current_user.preferred_currency,
+        {payment.next_payment_date for payment in upcoming_payments}
+    )
     for payment in upcoming_payments:
-        payment.amount_in_preferred = convert_currency(
-            payment.amount,
-            payment.currency,
-            current_user.preferred_currency
-        )
+        key = (payment.currency, payment.next_payment_date.date())
+        if key in rates:
+            payment.amount_in_preferred = (payment.amount or 0.0) * rates[key]
+        else:
+            payment.amount_in_preferred = convert_currency(payment.amount or 0.0, payment.currency, current_user.preferred_currency)
     
-    # Calculate totals
-    total_monthly = sum(spending_by_cycle.values())
-    total_yearly = total_monthly * 12
+    # What the active subscriptions charged over the last year, each payment
+    # at the rate of its own day
+    spent_last_year = compute_past_spending(
+        current_user.id, current_user.preferred_currency, now - timedelta(days=365), now
+    )
     
     # Pass current time to template
     current_datetime = datetime.now()
     
     return render_template(
         'reports.html',
-        subscriptions=subscriptions,
-        spending_by_cycle=spending_by_cycle,
+        total_subscriptions=costs['total_subscriptions'],
+        billing_cycles=BILLING_CYCLES,
+        spending_by_cycle=costs['spending_by_cycle'],
         upcoming_payments=upcoming_payments,
-        total_monthly=total_monthly,
-        total_yearly=total_yearly,
-        current_datetime=current_datetime
+        total_monthly=costs['monthly_total'],
+        total_yearly=costs['yearly_total'],
+        spent_last_year=spent_last_year,
+        current_datetime=current_datetime,
+        logo_bundle_url=logo_bundle_url(current_user.id)
     )
 
 # CSV import/export
+
+# Subscriptions fetched (and CSV rows sent) per round trip while exporting
+EXPORT_CHUNK_SIZE = 500
+
+EXPORT_FIELDS = [
+    'Name', 'URL', 'Logo URL', 'Amount', 'Currency', 'Billing Cycle', 'Start Date',
+    'Next Payment Date', 'Notes', 'Active', 'Created At', 'Updated At', 'Reminders'
+]
+
+def export_row(sub):
+    """Build one CSV export row for a subscription with its reminders loaded."""
+    reminders = [
+        f"{reminder.days_before} days (Email: {reminder.email_notification}, Push: {reminder.push_notification})"
+        for reminder in sub.reminders
+    ]
+    
+    return [
+        sub.name,
+        sub.url,
+        sub.logo_url or '',
+        sub.amount,
+        sub.currency,
+        sub.billing_cycle,
+        sub.start_date.strftime('%Y-%m-%d'),
+        sub.next_payment_date.strftime('%Y-%m-%d') if sub.next_payment_date else '',
+        sub.notes,
+        'Yes' if sub.is_active else 'No',
+        sub.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        sub.updated_at.strftime('%Y-%m-%d %H:%M:%S'),
+        '; '.join(reminders)
+    ]
+
 @app.route('/export_csv')
 @login_required
 def export_csv():
-    subscriptions = Subscription.query.filter_by(user_id=current_user.id).all()
-    
-    csv_data = []
-    for sub in subscriptions:
-        # Get reminders for this subscription
-        reminders = []
-        for reminder in sub.reminders:
-            reminders.append(f"{reminder.days_before} days (Email: {reminder.email_notification}, Push: {reminder.push_notification})")
-        
-        csv_data.append({
-            'Name': sub.name,
-            'URL': sub.url,
-            'Logo URL': sub.logo_url or '',
-            'Amount': sub.amount,
-            'Currency': sub.currency,
-            'Billing Cycle': sub.billing_cycle,
-            'Start Date': sub.start_date.strftime('%Y-%m-%d'),
-            'Next Payment Date': sub.next_payment_date.strftime('%Y-%m-%d') if sub.next_payment_date else '',
-            'Notes': sub.notes,
-            'Active': 'Yes' if sub.is_active else 'No',
-            'Created At': sub.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'Updated At': sub.updated_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'Reminders': '; '.join(reminders) if reminders else ''
-        })
-    
-    # Create a CSV in memory
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=csv_data[0].keys() if csv_data else [])
-    writer.writeheader()
-    writer.writerows(csv_data)
-    
-    # Create the response
-    mem_file = io.BytesIO()
-    mem_file.write(output.getvalue().encode('utf-8'))
-    mem_file.seek(0)
-    
-    return send_file(
-        mem_file,
+    user_id = current_user.id
+    
+    def generate():
+        # Rows are written to a small buffer that is flushed to the client
+        # every chunk, so memory use doesn't grow with the number of rows
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        
+        # Stream subscriptions from a server-side cursor; the reminders of
+        # each chunk are loaded together in one extra query
+        subscriptions = db.session.execute(
+            select(Subscription)
+            .filter_by(user_id=user_id)
+            .order_by(Subscription.id)
+            .options(selectinload(Subscription.reminders))
+            .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+        ).scalars()
+        
+        for index, sub in enumerate(subscriptions, start=1):
+            writer.writerow(export_row(sub))
+            if index % EXPORT_CHUNK_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        
+        yield buffer.getvalue()
+    
+    filename = f'subscriptions_{datetime.now().strftime("%Y%m%d")}.csv'
+    return Response(
+        stream_with_context(generate()),
         mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'subscriptions_{datetime.now().strftime("%Y%m%d")}.csv'
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
     )
 
 @app.route('/import_csv', methods=['POST'])
@@ -538,112 +509,13 @@ def import_csv():
         flash('Please upload a CSV file', 'danger')
         return redirect(url_for('dashboard'))
     
+    from import_jobs import submit_import_job
+    
     try:
-        # Read CSV file
-        stream = io.StringIO(file.stream.read().decode("UTF8"), newline=None)
-        csv_data = csv.DictReader(stream)
-        
-        for row in csv_data:
-            name = row['Name']
-            url = row.get('URL', '')
-            logo_url = row.get('Logo URL', '')  # Get logo URL if it exists
-            amount = float(row.get('Amount', 0))
-            currency = row.get('Currency', 'USD')
-            billing_cycle = row.get('Billing Cycle', 'monthly')
-            start_date_str = row.get('Start Date', datetime.utcnow().strftime('%Y-%m-%d'))
-            notes = row.get('Notes', '')
-            is_active = row.get('Active', 'Yes') == 'Yes'
-            
-            # Parse start date
-            try:
-                start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
-            except ValueError:
-                start_date = datetime.utcnow()
-            
-            # Check if subscription already exists (by name)
-            existing_sub = Subscription.query.filter_by(
-                user_id=current_user.id,
-                name=name
-            ).first()
-            
-            if existing_sub:
-                # Update existing subscription
-                existing_sub.url = url
-                # Update logo_url if provided in CSV, otherwise keep existing
-                if logo_url:
-                    existing_sub.logo_url = logo_url
-                existing_sub.amount = amount
-                existing_sub.currency = currency
-                existing_sub.billing_cycle = billing_cycle
-                existing_sub.start_date = start_date
-                existing_sub.notes = notes
-                existing_sub.is_active = is_active
-                existing_sub.calculate_next_payment_date()
-                
-                # Clear existing reminders
-                for reminder in existing_sub.reminders:
-                    db.session.delete(reminder)
-            else:
-                # Create new subscription
-                from utils import get_logo_url_for_service
-                if not logo_url:
-                    logo_url = get_logo_url_for_service(name, url)
-                
-                subscription = Subscription(
-                    user_id=current_user.id,
-                    name=name,
-                    url=url,
-                    logo_url=logo_url,
-                    amount=amount,
-                    currency=currency,
-                    billing_cycle=billing_cycle,
-                    start_date=start_date,
-                    notes=notes,
-                    is_active=is_active
-                )
-                
-                subscription.calculate_next_payment_date()
-                db.session.add(subscription)
-                
-                # Need to flush to get the ID before creating reminders
-                db.session.flush()
-            
-            # Process reminders if provided
-            if 'Reminders' in row and row['Reminders']:
-                reminder_strings = row['Reminders'].split(';')
-                for reminder_str in reminder_strings:
-                    try:
-                        # Parse reminder string (e.g., "7 days (Email: True, Push: False)")
-                        days = int(reminder_str.split(' days')[0])
-                        email = 'Email: True' in reminder_str
-                        push = 'Push: True' in reminder_str
-                        
-                        reminder = Reminder(
-                            user_id=current_user.id,
-                            subscription_id=existing_sub.id if existing_sub else subscription.id,
-                            days_before=days,
-                            email_notification=email,
-                            push_notification=push
-                        )
-                        db.session.add(reminder)
-                    except (ValueError, IndexError):
-                        continue
-            elif not existing_sub and subscription.billing_cycle != 'lifetime':
-                # Create default reminders for new subscription
-                default_days = [1, 7, 14]
-                for days in default_days:
-                    reminder = Reminder(
-                        user_id=current_user.id,
-                        subscription_id=subscription.id,
-                        days_before=days,
-                        email_notification=True,
-                        push_notification=False
-                    )
-                    db.session.add(reminder)
-        
-        # Commit all changes if successful
-        db.session.commit()
-        flash('CSV imported successfully', 'success')
+        # The import itself runs in the background, see import_jobs.py
+        job = submit_import_job(current_user.id, file)
+        flash('CSV import started. Your subscriptions will appear as soon as it has finished.', 'info')
+        return redirect(url_for('dashboard', import_job=job.id))
     except Exception as e:
         db.session.rollback()
         flash(f'Error importing CSV: {str(e)}', 'danger')
@@ -686,43 +558,128 @@ def settings():
 @app.route('/api/exchange_rates')
 @login_required
 def get_exchange_rates():
-    currencies = ['USD', 'EUR', 'CZK', 'PLN']
-    rates = {}
-    
-    # Get all exchange rates from the database
-    for base in currencies:
-        rates[base] = {}
-        for target in currencies:
-            if base == target:
-                rates[base][target] = 1.0
-            else:
-                exchange_rate = ExchangeRate.query.filter_by(
-                    base_currency=base,
-                    target_currency=target
-                ).first()
-                
-                if exchange_rate:
-                    rates[base][target] = exchange_rate.rate
-                else:
-                    # If no rate found, try to calculate via USD
-                    if base != 'USD' and target != 'USD':
-                        base_to_usd = ExchangeRate.query.filter_by(
-                            base_currency=base,
-                            target_currency='USD'
-                        ).first()
-                        usd_to_target = ExchangeRate.query.filter_by(
-                            base_currency='USD',
-                            target_currency=target
-                        ).first()
-                        
-                        if base_to_usd and usd_to_target:
-                            rates[base][target] = (1 / base_to_usd.rate) * usd_to_target.rate
-                        else:
-                            rates[base][target] = 1.0
-                    else:
-                        rates[base][target] = 1.0
-    
-    return jsonify(rates)
+    currencies = app.config['SUPPORTED_CURRENCIES']
+    
+    # Served from the in-memory rate matrix; convert_currency falls back to
+    # a conversion via USD and to 1.0 when no rate is known
+    rates = {
+        base: {
+            target: 1.0 if base == target else convert_currency(1.0, base, target)
+            for target in currencies
+        }
+        for base in currencies
+    }
+    
+    response = jsonify(rates)
+    
+    # Let browsers revalidate with If-None-Match / If-Modified-Since and get a 304
+    response.set_etag(hashlib.sha256(response.get_data()).hexdigest())
+    last_updated = get_rate_matrix_updated_at()
+    if last_updated:
+        response.last_modified = last_updated.replace(tzinfo=timezone.utc)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    
+    return response.make_conditional(request)
+
+@app.route('/api/subscriptions')
+@login_required
+def list_subscriptions():
+    from cost_engine import BILLING_CYCLES, compute_costs, subscription_columns
+    from logo_proxy import logo_src
+    from subscription_list import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, SORT_KEYS, subscription_page
+    
+    sort = request.args.get('sort', 'name')
+    order = request.args.get('order', 'asc')
+    if sort not in SORT_KEYS or order not in ('asc', 'desc'):
+        return jsonify({'success': False, 'message': f"sort must be one of {', '.join(SORT_KEYS)} and order asc or desc"}), 400
+    
+    # Optional filters: ?cycle=monthly&currency=EUR&active=true
+    billing_cycle = request.args.get('cycle') or None
+    if billing_cycle is not None and billing_cycle not in BILLING_CYCLES:
+        return jsonify({'success': False, 'message': f"cycle must be one of {', '.join(BILLING_CYCLES)}"}), 400
+    currency = request.args.get('currency') or None
+    active = request.args.get('active') or None
+    if active is not None and active not in ('true', 'false'):
+        return jsonify({'success': False, 'message': 'active must be true or false'}), 400
+    
+    limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    
+    try:
+        subscriptions, next_cursor = subscription_page(
+            current_user.id, sort, order,
+            after=request.args.get('after') or None,
+            limit=limit,
+            billing_cycle=billing_cycle,
+            currency=currency.upper() if currency else None,
+            is_active=None if active is None else active == 'true'
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    # Costs in preferred currency for the rows of this page only
+    costs = compute_costs(
+        *subscription_columns(subscriptions),
+        target_currency=current_user.preferred_currency
+    )
+    now = datetime.now()
+    
+    return jsonify({
+        'subscriptions': [
+            {
+                'id': sub.id,
+                'name': sub.name,
+                'url': sub.url,
+                'logo_url': sub.logo_url,
+                'logo_src': logo_src(sub.logo_url, sub.name),
+                'amount': sub.amount or 0.0,
+                'currency': sub.currency,
+                'billing_cycle': sub.billing_cycle,
+                'next_payment_date': sub.next_payment_date.strftime('%Y-%m-%d') if sub.next_payment_date else None,
+                'payment_due': bool(sub.next_payment_date and sub.next_payment_date <= now),
+                'is_active': bool(sub.is_active),
+                'amount_in_preferred': float(amount_in_preferred),
+                'monthly_cost': float(monthly_cost),
+                'yearly_cost': float(yearly_cost),
+                'edit_url': url_for('edit_subscription', id=sub.id),
+                'delete_url': url_for('delete_subscription', id=sub.id),
+            }
+            for sub, amount_in_preferred, monthly_cost, yearly_cost in zip(
+                subscriptions, costs['amount_in_preferred'], costs['monthly_cost'], costs['yearly_cost']
+            )
+        ],
+        'next': next_cursor,
+        'currency': current_user.preferred_currency,
+    })
+
+@app.route('/api/spending_summary')
+@login_required
+def spending_summary():
+    from cost_engine import compute_grouped_costs, summarize_costs
+    
+    # Optional ?as_of=YYYY-MM-DD converts at the exchange rates of that day
+    rate_date = None
+    as_of = request.args.get('as_of')
+    if as_of:
+        try:
+            rate_date = datetime.strptime(as_of, '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'success': False, 'message': 'as_of must be a YYYY-MM-DD date'}), 400
+    
+    costs = compute_grouped_costs(current_user.id, current_user.preferred_currency, rate_date)
+    
+    return jsonify(summarize_costs(costs))
+
+@app.route('/api/import_status/<job_id>')
+@login_required
+def import_status(job_id):
+    from import_jobs import import_job_status
+    
+    job = ImportJob.query.filter_by(id=job_id, user_id=current_user.id).first()
+    if not job:
+        return jsonify({'success': False, 'message': 'Import job not found'}), 404
+    
+    return jsonify(import_job_status(job))
 
 @app.route('/api/refresh_exchange_rates', methods=['POST'])
 @login_required
@@ -803,6 +760,83 @@ def create_subscription_reminders(subscription):
     # Note: We don't commit here anymore - let the calling function decide when to commit
     # This solves transaction issues during CSV import and other bulk operations
 
+# Stored logos are named after their content, so a URL always serves the same
+# file and browsers may keep it for a year without revalidating
+STORED_LOGO_MAX_AGE = 365 * 24 * 60 * 60
+
+@app.after_request
+def cache_stored_logos(response):
+    if response.status_code == 200 and STORED_LOGO_URL.match(request.path):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STORED_LOGO_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
+# Remote logos are served through the logo proxy, see logo_proxy.py
+@app.template_filter('logo_src')
+def logo_src_filter(logo_url, name=None):
+    from logo_proxy import logo_src
+    return logo_src(logo_url, name)
+
+@app.route('/logo/<key>')
+def logo(key):
+    from logo_proxy import LOGO_RETRY_SECONDS, fetch_logo, logo_url_for_key, placeholder_svg
+    
+    logo_url = logo_url_for_key(key)
+    if logo_url is None:
+        abort(404)
+    
+    path = fetch_logo(logo_url)
+    if path:
+        # The key names the remote URL, so its cached logo never changes
+        response = send_file(path, conditional=True, etag=True, max_age=STORED_LOGO_MAX_AGE)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    else:
+        response = Response(placeholder_svg(key, request.args.get('initial')), mimetype='image/svg+xml')
+        response.cache_control.public = True
+        response.cache_control.max_age = LOGO_RETRY_SECONDS
+    
+    # Remote SVGs must not run scripts when opened directly
+    response.headers['Content-Security-Policy'] = "default-src 'none'; style-src 'unsafe-inline'"
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+@app.route('/logos/<key>.json')
+@login_required
+def logos(key):
+    from logo_bundle import build_logo_bundle, logo_bundle_key, store_logo_bundle, stored_bundle_path, user_logo_urls
+    from logo_proxy import LOGO_RETRY_SECONDS
+    
+    # Only the bundle of the user's current logos is served; pages with an
+    # older key load their logos one by one
+    logo_urls = user_logo_urls(current_user.id)
+    if key != logo_bundle_key(logo_urls):
+        abort(404)
+    
+    stored = stored_bundle_path(key)
+    if stored is None:
+        bundle, complete, placeholders = build_logo_bundle(logo_urls)
+        if not complete:
+            # Asked for again on the next page load, when more logos are cached
+            response = jsonify(bundle)
+            response.cache_control.no_cache = True
+            return response
+        stored = store_logo_bundle(key, bundle, final=not placeholders), not placeholders
+    
+    path, final = stored
+    if final:
+        # The key names the set of logos, so a final bundle never changes
+        response = send_file(path, mimetype='application/json', conditional=True, etag=True, max_age=STORED_LOGO_MAX_AGE)
+        response.cache_control.immutable = True
+    else:
+        # Placeholders are replaced once the proxy has tried their logos again
+        response = send_file(path, mimetype='application/json', conditional=True, etag=True, max_age=LOGO_RETRY_SECONDS)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
+
 # Error handlers
 @app.errorhandler(404)
 def not_found_error(error):
@@ -1,46 +1,192 @@
+import os
+import threading
+
+if __name__ == '__main__':
+    # Running as the dedicated scheduler process: app.py must not start
+    # a second, embedded scheduler while it is being imported below.
+    os.environ['RUN_SCHEDULER'] = 'false'
+
+from datetime import datetime
 from apscheduler.schedulers.background import BackgroundScheduler
-from app import app
+from apscheduler.schedulers.blocking import BlockingScheduler
+from sqlalchemy import text
+from app import app, db
 from utils import fetch_exchange_rates, check_upcoming_reminders, reset_reminders_for_next_period
+from import_jobs import resume_import_jobs
 import logging
 
 logger = logging.getLogger(__name__)
 
-def init_scheduler():
-    """Initialize the scheduler for recurring tasks."""
-    scheduler = BackgroundScheduler()
-    
-    # Update exchange rates daily
+# Key of the PostgreSQL advisory lock held by the process that runs the jobs.
+# Every web worker (and any `python scheduler.py` process) competes for it,
+# so each job runs in exactly one place no matter how many workers there are.
+SCHEDULER_LOCK_ID = 72150813
+
+# How often (in seconds) standby processes try to take over the lock,
+# and the leader checks that it still holds it
+LEADER_CHECK_INTERVAL = 60
+
+# Connection holding the advisory lock while this process is the leader.
+# Session-level advisory locks are released when this connection closes.
+_leader_connection = None
+_leader_lock = threading.Lock()
+
+def _try_acquire_leadership():
+    """Try to take the scheduler lock on a dedicated connection. Returns True on success."""
+    global _leader_connection
+
+    connection = db.engine.connect()
+    try:
+        acquired = connection.execute(
+            text('SELECT pg_try_advisory_lock(:key)'),
+            {'key': SCHEDULER_LOCK_ID}
+        ).scalar()
+        # End the implicit transaction; the session-level lock survives it
+        connection.commit()
+    except Exception:
+        connection.close()
+        raise
+
+    if not acquired:
+        connection.close()
+        return False
+
+    _leader_connection = connection
+    return True
+
+def _still_leader():
+    """Return True if this process still holds the scheduler lock."""
+    global _leader_connection
+
+    # Jobs and the election run in different threads but share the connection
+    with _leader_lock:
+        if _leader_connection is None:
+            return False
+
+        # The lock lives as long as the connection's session does
+        try:
+            _leader_connection.execute(text('SELECT 1'))
+            _leader_connection.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Lost the scheduler lock connection: {str(e)}")
+            try:
+                _leader_connection.invalidate()
+                _leader_connection.close()
+            except Exception:
+                pass
+            _leader_connection = None
+            return False
+
+def _run_job(job):
+    """Run a scheduled job inside an app context, but only on the leader."""
+    with app.app_context():
+        if not _still_leader():
+            logger.warning(f"Skipping {job.__name__}: this process is no longer the scheduler leader")
+            return
+
+        job()
+
+def _add_jobs(scheduler):
+    """Schedule the recurring tasks. Called once this process becomes the leader."""
+    # Update exchange rates daily, starting right away to initialize data
     scheduler.add_job(
-        fetch_exchange_rates,
+        _run_job,
         'interval',
+        args=[fetch_exchange_rates],
+        name='fetch_exchange_rates',
         days=1,
+        next_run_time=datetime.now(),
         id='update_exchange_rates',
         replace_existing=True
     )
-    
+
     # Check for reminders hourly
     scheduler.add_job(
-        check_upcoming_reminders,
+        _run_job,
         'interval',
+        args=[check_upcoming_reminders],
+        name='check_upcoming_reminders',
         hours=1,
         id='check_reminders',
         replace_existing=True
     )
-    
-    # Reset reminders daily
+
+    # Roll payment dates forward and reset reminders daily, starting right
+    # away: leadership changes with every restart, which would otherwise
+    # push the first run back by a day each time
     scheduler.add_job(
-        reset_reminders_for_next_period,
+        _run_job,
         'interval',
+        args=[reset_reminders_for_next_period],
+        name='reset_reminders_for_next_period',
         days=1,
+        next_run_time=datetime.now(),
         id='reset_reminders',
         replace_existing=True
     )
-    
+
+    # Pick up CSV imports abandoned by a worker that went away
+    scheduler.add_job(
+        _run_job,
+        'interval',
+        args=[resume_import_jobs],
+        name='resume_import_jobs',
+        minutes=5,
+        id='resume_import_jobs',
+        replace_existing=True
+    )
+
+def _remove_jobs(scheduler):
+    """Drop the recurring tasks after losing the leadership."""
+    for job_id in ('update_exchange_rates', 'check_reminders', 'reset_reminders', 'resume_import_jobs'):
+        if scheduler.get_job(job_id):
+            scheduler.remove_job(job_id)
+
+def _elect_leader(scheduler):
+    """Become the leader if nobody holds the scheduler lock, or step down if we lost it."""
+    with app.app_context():
+        if _leader_connection is not None:
+            if _still_leader():
+                return
+            _remove_jobs(scheduler)
+            logger.warning("Scheduler leadership lost, waiting to take over again")
+
+        try:
+            if _try_acquire_leadership():
+                _add_jobs(scheduler)
+                logger.info(f"Process {os.getpid()} is now the scheduler leader")
+        except Exception as e:
+            logger.error(f"Scheduler leader election failed: {str(e)}")
+
+def init_scheduler(scheduler=None):
+    """
+    Initialize the scheduler for recurring tasks.
+
+    Every process runs a scheduler that only takes part in the leader
+    election. The recurring tasks are added once this process holds the
+    scheduler lock, so they run in one process only. Pass a BlockingScheduler
+    to run in the foreground, as `python scheduler.py` does.
+    """
+    if scheduler is None:
+        scheduler = BackgroundScheduler()
+
+    # Runs right away, then keeps checking in the background
+    scheduler.add_job(
+        _elect_leader,
+        'interval',
+        args=[scheduler],
+        seconds=LEADER_CHECK_INTERVAL,
+        next_run_time=datetime.now(),
+        id='elect_leader',
+        replace_existing=True
+    )
+
     # Start the scheduler
-    scheduler.start()
     logger.info("Scheduler started")
-    
-    # Run immediately to initialize data
-    fetch_exchange_rates()
-    
+    scheduler.start()
+
     return scheduler
+
+if __name__ == '__main__':
+    init_scheduler(BlockingScheduler())
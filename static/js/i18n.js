@@ -2,6 +2,7 @@
 document.addEventListener('DOMContentLoaded', function() {
   // Default language
   let currentLanguage = 'en';
+  let currentTranslations = null;
   
   // Try to get language from localStorage
   const storedLanguage = localStorage.getItem('language');
@@ -65,6 +66,7 @@ document.addEventListener('DOMContentLoaded', function() {
     fetch(`/static/locales/${lang}/translation.json`)
       .then(response => response.json())
       .then(translations => {
+        currentTranslations = translations;
         applyTranslations(translations);
         
         // Trigger custom event for other components
@@ -77,13 +79,25 @@ document.addEventListener('DOMContentLoaded', function() {
       });
   }
   
+  // Translate content added after the page loaded, e.g. table rows
+  window.translateElements = function(root) {
+    if (currentTranslations) {
+      applyTranslations(currentTranslations, root);
+    }
+  };
+  
   // Apply translations to elements with data-i18n attribute
-  function applyTranslations(translations) {
+  function applyTranslations(translations, root = document) {
     // Get all elements with data-i18n attribute
-    const elements = document.querySelectorAll('[data-i18n]');
+    const elements = root.querySelectorAll('[data-i18n]');
     
     elements.forEach(element => {
-      const key = element.getAttribute('data-i18n');
+      let key = element.getAttribute('data-i18n');
+      // "[html]key" translations contain markup
+      const isHtml = key.startsWith('[html]');
+      if (isHtml) {
+        key = key.slice('[html]'.length);
+      }
       const translation = getNestedTranslation(translations, key);
       
       if (translation) {
@@ -91,6 +105,10 @@ document.addEventListener('DOMContentLoaded', function() {
         if (element.tagName === 'INPUT' && element.hasAttribute('placeholder')) {
           element.placeholder = translation;
         } 
+        // Markup with its {{placeholders}} filled in from data-i18n-options
+        else if (isHtml) {
+          element.innerHTML = interpolate(translation, element.getAttribute('data-i18n-options'));
+        }
         // Otherwise set the text content
         else {
           element.textContent = translation;
@@ -99,6 +117,23 @@ document.addEventListener('DOMContentLoaded', function() {
     });
   }
   
+  // Replace {{name}} placeholders with the escaped values of a JSON object
+  function interpolate(translation, options) {
+    let values = {};
+    try {
+      values = JSON.parse(options || '{}');
+    } catch (error) {
+      console.error('Invalid data-i18n-options:', options);
+    }
+    return translation.replace(/\{\{\s*(\w+)\s*\}\}/g, (match, name) => escapeHtml(values[name] ?? ''));
+  }
+  
+  function escapeHtml(value) {
+    const element = document.createElement('span');
+    element.textContent = String(value);
+    return element.innerHTML.replace(/"/g, '&quot;');
+  }
+  
   // Get nested translation by dot notation
   function getNestedTranslation(obj, path) {
     return path.split('.').reduce((p, c) => (p && p[c]) ? p[c] : null, obj);
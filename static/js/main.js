@@ -32,8 +32,173 @@ document.addEventListener('DOMContentLoaded', function() {
       form.classList.add('was-validated');
     }, false);
   });
+  
+  // Show subscription logos from their bundle
+  document.querySelectorAll('[data-logo-bundle]').forEach(showLogos);
+  
+  // Follow a CSV import started from this page
+  const importJobId = new URLSearchParams(window.location.search).get('import_job');
+  if (importJobId) {
+    watchImportJob(importJobId);
+  }
 });
 
+// Poll a background CSV import, show its progress and reload once it has finished
+function watchImportJob(jobId) {
+  const container = document.getElementById('flash-messages');
+  const status = document.createElement('div');
+  status.className = 'alert alert-info';
+  status.setAttribute('role', 'status');
+  container?.appendChild(status);
+  
+  const poll = () => {
+    fetch(`/api/import_status/${jobId}`)
+      .then(response => response.ok ? response.json() : null)
+      .then(job => {
+        if (!job) {
+          status.remove();
+          return;
+        }
+        if (job.status === 'completed') {
+          window.location.replace(window.location.pathname);
+          return;
+        }
+        if (job.status === 'failed') {
+          status.className = 'alert alert-danger';
+          status.textContent = `Error importing CSV after ${job.rows_processed} rows: ${job.error}`;
+          return;
+        }
+        status.textContent = `Importing ${job.filename}: ${job.rows_processed} rows processed (${job.rows_per_second} rows/s)`;
+        setTimeout(poll, 2000);
+      })
+      .catch(() => setTimeout(poll, 5000));
+  };
+  poll();
+}
+
+// Load a logo bundle (a JSON object of logo URL -> data: URI) once per page
+function fetchLogoBundle(url) {
+  window.logoBundleRequests = window.logoBundleRequests || {};
+  if (!window.logoBundleRequests[url]) {
+    window.logoBundleRequests[url] = fetch(url)
+      .then(response => response.ok ? response.json() : {})
+      .catch(() => ({}));
+  }
+  return window.logoBundleRequests[url];
+}
+
+// Fill in the logos inside a [data-logo-bundle] element. Logos missing from
+// the bundle are loaded from their own URL (data-logo-src).
+function showLogos(container) {
+  const images = container.querySelectorAll('img[data-logo]:not([src])');
+  if (!images.length) {
+    return Promise.resolve();
+  }
+  return fetchLogoBundle(container.dataset.logoBundle).then(bundle => {
+    images.forEach(img => {
+      img.src = bundle[img.dataset.logo] || img.dataset.logoSrc;
+    });
+  });
+}
+
+// Escape text for use in HTML built from template strings
+function escapeHtml(value) {
+  return String(value ?? '').replace(/[&<>"']/g, char => ({
+    '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+  }[char]));
+}
+
+// Load a subscription table page by page from /api/subscriptions.
+// renderRow turns one subscription into the HTML of a table row. Query
+// parameters come from data-params on the table and from the form named by
+// data-filters, which reloads the table when changed. The next page is
+// loaded when the button named by data-more scrolls into view.
+function initSubscriptionTable(table, renderRow) {
+  const tbody = table.querySelector('tbody');
+  const filters = table.dataset.filters ? document.getElementById(table.dataset.filters) : null;
+  const moreButton = document.getElementById(table.dataset.more);
+  const columns = table.querySelectorAll('thead th').length;
+  let cursor = null;
+  let loading = null;
+  let generation = 0;
+  
+  const moreInView = () => moreButton.getBoundingClientRect().top < window.innerHeight + 200;
+  
+  const loadPage = () => {
+    if (loading) {
+      return loading;
+    }
+    const request = generation;
+    const params = new URLSearchParams(table.dataset.params || '');
+    if (filters) {
+      new FormData(filters).forEach((value, name) => {
+        if (value) {
+          params.set(name, value);
+        }
+      });
+    }
+    if (cursor) {
+      params.set('after', cursor);
+    }
+    
+    loading = fetch(`/api/subscriptions?${params}`)
+      .then(response => {
+        if (!response.ok) {
+          throw new Error(`Failed to load subscriptions: ${response.status}`);
+        }
+        return response.json();
+      })
+      .then(page => {
+        // The filters changed while this page was loading
+        if (request !== generation) {
+          return false;
+        }
+        tbody.insertAdjacentHTML('beforeend', page.subscriptions.map(renderRow).join(''));
+        if (!tbody.children.length) {
+          tbody.innerHTML = `<tr><td colspan="${columns}" class="text-center text-muted" data-i18n="subscription.no_matches">No subscriptions match the filters</td></tr>`;
+        }
+        cursor = page.next;
+        moreButton.hidden = !cursor;
+        showLogos(table);
+        window.translateElements?.(tbody);
+        return true;
+      })
+      .catch(error => {
+        console.error('Error loading subscriptions:', error);
+        return false;
+      })
+      .then(loaded => {
+        if (request === generation) {
+          loading = null;
+          // Keep filling the screen while the button stays in view
+          if (loaded && cursor && moreInView()) {
+            loadPage();
+          }
+        }
+      });
+    return loading;
+  };
+  
+  const reload = () => {
+    generation += 1;
+    cursor = null;
+    loading = null;
+    tbody.innerHTML = '';
+    moreButton.hidden = true;
+    loadPage();
+  };
+  
+  filters?.addEventListener('change', reload);
+  moreButton.addEventListener('click', loadPage);
+  new IntersectionObserver(entries => {
+    if (cursor && entries.some(entry => entry.isIntersecting)) {
+      loadPage();
+    }
+  }, { rootMargin: '200px' }).observe(moreButton);
+  
+  loadPage();
+}
+
 // Format currency values
 function formatCurrencyValue(e) {
   const input = e.target;
@@ -48,6 +213,33 @@ function formatCurrencyValue(e) {
 // This function is now defined in i18n.js
 // changeLanguage(lang) { ... }
 
+// Load the exchange rate matrix into window.exchangeRates.
+// The request is made once per page; the API sends an ETag, so repeat
+// loads are answered with 304 Not Modified from the browser cache.
+function fetchExchangeRates(forceRefresh = false) {
+  if (!forceRefresh && window.exchangeRatesRequest) {
+    return window.exchangeRatesRequest;
+  }
+  
+  window.exchangeRatesRequest = fetch('/api/exchange_rates')
+    .then(response => {
+      if (!response.ok) {
+        throw new Error(`Failed to load exchange rates: ${response.status}`);
+      }
+      return response.json();
+    })
+    .then(rates => {
+      window.exchangeRates = rates;
+      return rates;
+    })
+    .catch(error => {
+      window.exchangeRatesRequest = null;
+      throw error;
+    });
+  
+  return window.exchangeRatesRequest;
+}
+
 // Currency conversion helper
 function convertCurrency(amount, fromCurrency, toCurrency) {
   // Get exchange rates from the data attribute or API
@@ -0,0 +1,88 @@
+"""
+Keyset-paginated subscription listing.
+
+The dashboard and reports tables load a user's subscriptions page by page
+from /api/subscriptions instead of rendering all of them. Each page ends
+with a cursor holding the sort key and id of its last row, and the next
+page starts right after that row. Unlike OFFSET, the database only reads
+the rows it returns however far the user scrolls, and subscriptions added
+or removed in the meantime don't shift later pages.
+"""
+from datetime import datetime
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import func, select, tuple_
+from app import app, db
+from models import Subscription
+
+# Subscriptions per page when the client doesn't ask for a size, and at most
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Sort orders by name; ties are broken by id. Subscriptions without a
+# next payment date (lifetime ones) sort after all others.
+SORT_KEYS = {
+    'name': func.lower(Subscription.name),
+    'amount': func.coalesce(Subscription.amount, 0.0),
+    'next_payment': func.coalesce(Subscription.next_payment_date, datetime.max),
+}
+
+def _serializer():
+    return URLSafeSerializer(app.secret_key, salt='subscription-cursor')
+
+def encode_cursor(sort, order, key, subscription_id):
+    """Return the cursor of the page after the row with the given sort key and id."""
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    return _serializer().dumps([sort, order, key, subscription_id])
+
+def decode_cursor(cursor, sort, order):
+    """
+    Return the (sort key, id) a cursor points after.
+    Raises ValueError for an invalid cursor or one of another sort order.
+    """
+    try:
+        cursor_sort, cursor_order, key, subscription_id = _serializer().loads(cursor)
+    except (BadSignature, TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if (cursor_sort, cursor_order) != (sort, order):
+        raise ValueError("The cursor belongs to another sort order")
+    if sort == 'next_payment':
+        key = datetime.fromisoformat(key)
+    return key, subscription_id
+
+def subscription_page(user_id, sort='name', order='asc', after=None, limit=DEFAULT_PAGE_SIZE,
+                      billing_cycle=None, currency=None, is_active=None):
+    """
+    Return one page of a user's subscriptions as (subscriptions, next cursor).
+    The cursor is None on the last page. Filters left as None match everything.
+    """
+    key = SORT_KEYS[sort]
+    query = select(Subscription, key).where(Subscription.user_id == user_id)
+    if billing_cycle is not None:
+        query = query.where(Subscription.billing_cycle == billing_cycle)
+    if currency is not None:
+        query = query.where(Subscription.currency == currency)
+    if is_active is not None:
+        query = query.where(Subscription.is_active == is_active)
+
+    if after is not None:
+        after_key, after_id = decode_cursor(after, sort, order)
+        position = tuple_(key, Subscription.id)
+        if order == 'desc':
+            query = query.where(position < tuple_(after_key, after_id))
+        else:
+            query = query.where(position > tuple_(after_key, after_id))
+
+    if order == 'desc':
+        query = query.order_by(key.desc(), Subscription.id.desc())
+    else:
+        query = query.order_by(key, Subscription.id)
+
+    # One extra row tells whether there is a next page
+    rows = db.session.execute(query.limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_subscription, last_key = rows[-1]
+        next_cursor = encode_cursor(sort, order, last_key, last_subscription.id)
+    return [subscription for subscription, _ in rows], next_cursor
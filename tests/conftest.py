@@ -0,0 +1,102 @@
+"""
+Shared test setup.
+
+The app is configured from the environment when it's imported, so the test
+settings are put in place first. Tests that need the database use the
+`database` fixture and are skipped unless TEST_DATABASE_URL points at a
+PostgreSQL database they may empty, e.g.
+
+    TEST_DATABASE_URL=postgresql://postgres:postgres@db:5432/subscriptionsage_test python -m pytest
+"""
+import os
+import sys
+import threading
+from datetime import datetime
+from http.server import ThreadingHTTPServer
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ['DATABASE_URL'] = os.environ.get('TEST_DATABASE_URL', 'sqlite://')
+os.environ.setdefault('SESSION_SECRET', 'test-secret')
+os.environ['RUN_SCHEDULER'] = 'false'
+os.environ['CREATE_TABLES_ON_STARTUP'] = 'false'
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app import app, db
+
+@pytest.fixture(scope='session')
+def _schema():
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            pytest.skip("Set TEST_DATABASE_URL to a PostgreSQL database to run database tests")
+        try:
+            db.drop_all()
+            db.create_all()
+        except OperationalError as e:
+            pytest.skip(f"Test database is unavailable: {e}")
+
+@pytest.fixture
+def database(_schema):
+    """The app's db in an app context, with all tables emptied afterwards."""
+    with app.app_context():
+        yield db
+        db.session.rollback()
+        tables = ', '.join(f'"{table.name}"' for table in db.metadata.sorted_tables)
+        db.session.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+        db.session.commit()
+        db.session.remove()
+
+@pytest.fixture
+def user(database):
+    from models import User
+
+    user = User(username='tester', email='tester@example.com', preferred_currency='EUR', password_hash='-')
+    database.session.add(user)
+    database.session.commit()
+    return user
+
+@pytest.fixture
+def make_subscription(database, user):
+    """Return a function that adds a subscription of the test user."""
+    from models import Subscription
+
+    def make_subscription(**fields):
+        values = {
+            'user_id': user.id,
+            'name': 'Netflix',
+            'amount': 10.0,
+            'currency': 'EUR',
+            'billing_cycle': 'monthly',
+            'start_date': datetime.utcnow(),
+            'next_payment_date': datetime.utcnow(),
+            'is_active': True,
+        }
+        values.update(fields)
+        subscription = Subscription(**values)
+        database.session.add(subscription)
+        database.session.commit()
+        return subscription
+
+    return make_subscription
+
+@pytest.fixture
+def http_server():
+    """
+    Return a function that serves a BaseHTTPRequestHandler subclass on a
+    local port for the duration of the test. It returns the server's host:port.
+    """
+    servers = []
+
+    def start(handler_class):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler_class)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"127.0.0.1:{server.server_port}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,89 @@
+"""Exchange rate fetches against a local stand-in for the rates API."""
+import json
+import time
+from http.server import BaseHTTPRequestHandler
+import pytest
+from flask_login import login_user
+import utils
+from app import app
+from models import ExchangeRate, ExchangeRateHistory
+
+USD_RATES = {'USD': 1, 'EUR': 0.9, 'CZK': 22.5, 'PLN': 3.9, 'GBP': 0.8}
+
+def _rates_api(status=200, delay=0):
+    """Return a handler class answering every GET like the rates API."""
+    class Handler(BaseHTTPRequestHandler):
+        requests = []
+
+        def do_GET(self):
+            Handler.requests.append(self.path)
+            time.sleep(delay)
+            body = json.dumps({'result': 'success', 'rates': USD_RATES}).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+@pytest.fixture
+def rates_api(http_server, monkeypatch):
+    """Return a function pointing the app at a local rates API with the given behaviour."""
+    def start(**behaviour):
+        handler = _rates_api(**behaviour)
+        monkeypatch.setitem(app.config, 'EXCHANGE_RATE_API_URL', f"http://{http_server(handler)}/v6/latest/")
+        return handler
+
+    monkeypatch.setattr(utils, 'EXCHANGE_RATE_API_TIMEOUT', (0.5, 0.5))
+    return start
+
+def test_fetches_rates_for_base(rates_api):
+    api = rates_api()
+
+    assert utils._fetch_rates_for_base('USD', 'key') == USD_RATES
+    assert api.requests == ['/v6/latest/USD?apikey=key']
+
+def test_error_response_gives_no_rates(rates_api):
+    rates_api(status=500)
+
+    assert utils._fetch_rates_for_base('USD', 'key') is None
+
+def test_slow_api_times_out(rates_api):
+    rates_api(delay=2)
+
+    started = time.monotonic()
+    assert utils._fetch_rates_for_base('USD', 'key') is None
+    assert time.monotonic() - started < 1.5
+
+def test_fetch_stores_cross_rates_with_one_request(database, user, rates_api):
+    api = rates_api()
+    user.exchange_rate_api_key = 'key'
+    database.session.commit()
+
+    with app.test_request_context():
+        login_user(user)
+        utils.fetch_exchange_rates()
+
+    assert len(api.requests) == 1
+    rates = {(rate.base_currency, rate.target_currency): rate.rate for rate in ExchangeRate.query}
+    # Every pair between USD, EUR, CZK and PLN
+    assert len(rates) == 12
+    assert rates[('EUR', 'CZK')] == 25
+    assert ExchangeRateHistory.query.count() == 3
+    assert utils.convert_currency(10, 'EUR', 'PLN') == pytest.approx(10 * 3.9 / 0.9, rel=1e-5)
+
+def test_failed_fetch_falls_back_to_default_rates(database, user, rates_api):
+    rates_api(status=503)
+    user.exchange_rate_api_key = 'key'
+    database.session.commit()
+
+    with app.test_request_context():
+        login_user(user)
+        utils.fetch_exchange_rates()
+
+    assert ExchangeRate.query.count() == 12
+    assert ExchangeRateHistory.query.count() == 0
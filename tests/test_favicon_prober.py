@@ -0,0 +1,92 @@
+"""Favicon probing against local websites."""
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from favicon_prober import FaviconProber
+
+def _website(favicons, delays=None):
+    """
+    Return a handler class answering HEAD with 200 for the paths in
+    `favicons` and 404 otherwise, after the delay in seconds given for the
+    path in `delays`. The class records the requests in flight per server.
+    """
+    delays = delays or {}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        in_flight = {}
+        max_in_flight = {}
+        requests = []
+
+        def do_HEAD(self):
+            port = self.server.server_port
+            with lock:
+                Handler.requests.append(self.path)
+                Handler.in_flight[port] = Handler.in_flight.get(port, 0) + 1
+                Handler.max_in_flight[port] = max(Handler.max_in_flight.get(port, 0), Handler.in_flight[port])
+            try:
+                time.sleep(delays.get(self.path, 0.05))
+                self.send_response(200 if self.path in favicons else 404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+            finally:
+                with lock:
+                    Handler.in_flight[port] -= 1
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def test_finds_most_preferred_favicon(http_server):
+    domain = http_server(_website({'/favicon.png', '/apple-touch-icon.png'}))
+
+    assert FaviconProber().probe('http', domain) == f"http://{domain}/favicon.png"
+
+def test_requests_per_host_are_limited(http_server):
+    website = _website(set(), delays={'/favicon.ico': 0.2, '/favicon.png': 0.2,
+                                      '/apple-touch-icon.png': 0.2, '/apple-icon.png': 0.2})
+    domains = [http_server(website) for _ in range(3)]
+
+    started = time.monotonic()
+    results = FaviconProber(max_workers=8, per_host=2).probe_many([('http', domain) for domain in domains])
+
+    assert results == {domain: None for domain in domains}
+    assert len(website.requests) == 12
+    assert max(website.max_in_flight.values()) == 2
+    # Websites are still probed at the same time: one after the other
+    # would take 3 x 0.4s
+    assert time.monotonic() - started < 1.0
+
+def test_slow_favicon_times_out(http_server):
+    domain = http_server(_website({'/favicon.ico', '/favicon.png'}, delays={'/favicon.ico': 2}))
+
+    started = time.monotonic()
+    favicon = FaviconProber(timeout=0.3).probe('http', domain)
+
+    assert favicon == f"http://{domain}/favicon.png"
+    assert time.monotonic() - started < 1.5
+
+def test_unreachable_website_has_no_favicon():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        domain = f"127.0.0.1:{sock.getsockname()[1]}"
+
+    assert FaviconProber(timeout=0.5).probe('http', domain) is None
+
+def test_concurrent_batches_share_host_limit_and_drop_it_after(http_server):
+    website = _website(set(), delays={'/favicon.ico': 0.2, '/favicon.png': 0.2,
+                                      '/apple-touch-icon.png': 0.2, '/apple-icon.png': 0.2})
+    domain = http_server(website)
+    prober = FaviconProber(max_workers=8, per_host=2)
+
+    batches = [threading.Thread(target=prober.probe, args=('http', domain)) for _ in range(3)]
+    for batch in batches:
+        batch.start()
+    for batch in batches:
+        batch.join()
+
+    assert len(website.requests) == 12
+    assert max(website.max_in_flight.values()) == 2
+    assert prober._host_slots == {}
@@ -0,0 +1,45 @@
+import os
+import time
+from collections import OrderedDict
+import pytest
+import logo_proxy
+from app import app
+from logo_bundle import build_logo_bundle, logo_bundle_key, store_logo_bundle, stored_bundle_path
+from logo_proxy import LOGO_RETRY_SECONDS
+
+LOGO_URL = 'https://cdn.example.com/logo.png'
+
+@pytest.fixture(autouse=True)
+def cache_folder(tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'LOGO_CACHE_FOLDER', str(tmp_path))
+    monkeypatch.setattr(logo_proxy, '_failed_fetches', OrderedDict())
+    return tmp_path
+
+def test_uncached_remote_logo_leaves_bundle_incomplete():
+    bundle, complete, placeholders = build_logo_bundle([LOGO_URL])
+
+    assert bundle == {}
+    assert not complete
+    assert not placeholders
+
+def test_failed_remote_logo_gets_placeholder():
+    logo_proxy._record_failure(logo_proxy._cache_name(LOGO_URL))
+
+    bundle, complete, placeholders = build_logo_bundle([LOGO_URL])
+
+    assert complete
+    assert placeholders
+    assert bundle[LOGO_URL].startswith('data:image/svg+xml;base64,')
+
+def test_bundle_with_placeholders_expires():
+    key = logo_bundle_key([LOGO_URL])
+    path = store_logo_bundle(key, {LOGO_URL: 'data:,'}, final=False)
+    assert stored_bundle_path(key) == (path, False)
+
+    expired = time.time() - LOGO_RETRY_SECONDS - 1
+    os.utime(path, (expired, expired))
+    assert stored_bundle_path(key) is None
+
+    final_path = store_logo_bundle(key, {LOGO_URL: 'data:,'})
+    assert stored_bundle_path(key) == (final_path, True)
+    assert not os.path.exists(path)
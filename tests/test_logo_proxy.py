@@ -0,0 +1,124 @@
+"""The logo proxy against a local origin server."""
+import socket
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler
+from io import BytesIO
+import pytest
+import logo_proxy
+from app import app
+from logo_proxy import LOGO_RETRY_SECONDS, logo_src
+
+Image = pytest.importorskip('PIL.Image')
+
+def _png():
+    buffer = BytesIO()
+    Image.new('RGB', (300, 200), (0, 128, 255)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+class Origin(BaseHTTPRequestHandler):
+    """Serves /logo.png, redirects /metadata to a link-local address and fails everything else."""
+    requests = []
+
+    def do_GET(self):
+        Origin.requests.append((self.path, self.headers['Host']))
+        if self.path == '/logo.png':
+            body = _png()
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+        elif self.path == '/metadata':
+            body = b''
+            self.send_response(302)
+            self.send_header('Location', 'http://169.254.169.254/latest/meta-data/')
+        else:
+            body = b'error'
+            self.send_response(500)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def origin(http_server, tmp_path, monkeypatch):
+    """The origin's host:port. The loopback address counts as public, other private ones don't."""
+    Origin.requests = []
+    monkeypatch.setitem(app.config, 'LOGO_CACHE_FOLDER', str(tmp_path))
+    monkeypatch.setitem(app.config, 'LOGO_PROXY_ALLOW_PRIVATE', False)
+    monkeypatch.setattr(logo_proxy, '_failed_fetches', OrderedDict())
+    is_public = logo_proxy._is_public
+    monkeypatch.setattr(logo_proxy, '_is_public', lambda address: address == '127.0.0.1' or is_public(address))
+    return http_server(Origin)
+
+def _src(logo_url, name='Netflix'):
+    with app.test_request_context():
+        return logo_src(logo_url, name)
+
+def test_logo_is_fetched_once_then_served_from_cache(origin):
+    client = app.test_client()
+    src = _src(f"http://{origin}/logo.png")
+
+    first = client.get(src)
+    second = client.get(src)
+
+    assert first.status_code == second.status_code == 200
+    assert first.mimetype == 'image/webp'
+    assert first.cache_control.immutable
+    assert second.data == first.data
+    assert Origin.requests == [('/logo.png', origin)]
+    assert logo_proxy._fetch_locks == {}
+
+def test_connection_goes_to_checked_address(origin, monkeypatch):
+    # The first lookup is checked, a second one would rebind to a private address
+    port = int(origin.rsplit(':', 1)[1])
+    answers = ['127.0.0.1', '10.0.0.1']
+    lookups = []
+    getaddrinfo = socket.getaddrinfo
+
+    def rebinding_getaddrinfo(host, *args, **kwargs):
+        if host == 'logos.test':
+            lookups.append(host)
+            host = answers[min(len(lookups), len(answers)) - 1]
+        return getaddrinfo(host, *args, **kwargs)
+
+    monkeypatch.setattr(socket, 'getaddrinfo', rebinding_getaddrinfo)
+
+    assert logo_proxy.fetch_logo(f"http://logos.test:{port}/logo.png") is not None
+    assert lookups == ['logos.test']
+    assert Origin.requests == [('/logo.png', f"logos.test:{port}")]
+
+def test_redirect_to_private_address_is_rejected(origin):
+    response = app.test_client().get(_src(f"http://{origin}/metadata"))
+
+    assert response.mimetype == 'image/svg+xml'
+    assert Origin.requests == [('/metadata', origin)]
+
+def test_failed_logo_gets_placeholder_until_retry(origin):
+    client = app.test_client()
+    src = _src(f"http://{origin}/missing.png")
+
+    first = client.get(src)
+    second = client.get(src)
+
+    assert first.mimetype == 'image/svg+xml'
+    assert b'>N</text>' in first.data
+    assert first.cache_control.max_age == LOGO_RETRY_SECONDS
+    assert second.data == first.data
+    assert len(Origin.requests) == 1
+
+def test_failed_fetches_are_bounded(origin, monkeypatch):
+    monkeypatch.setattr(logo_proxy, 'MAX_FAILED_FETCHES', 2)
+
+    for i in range(4):
+        assert logo_proxy.fetch_logo(f"http://{origin}/missing-{i}.png") is None
+
+    assert len(logo_proxy._failed_fetches) == 2
+    assert logo_proxy._fetch_locks == {}
+
+def test_key_with_bad_signature_is_not_found(origin):
+    key = _src(f"http://{origin}/logo.png").split('/logo/', 1)[1].split('?', 1)[0]
+
+    response = app.test_client().get(f"/logo/{key[:-2]}xx")
+
+    assert response.status_code == 404
+    assert Origin.requests == []
@@ -0,0 +1,133 @@
+"""Content-addressed logo files and their reference counts."""
+import hashlib
+import os
+import threading
+from concurrent.futures import Future
+from io import BytesIO
+import pytest
+from sqlalchemy import update
+from werkzeug.datastructures import FileStorage
+import utils
+from app import app
+from image_pipeline import process_logo_image, write_file
+from models import StoredLogo, Subscription
+from utils import LOGO_UPLOAD_DIR, _finish_logo_upload, _retain_stored_logo, handle_image_upload, release_logo
+
+Image = pytest.importorskip('PIL.Image')
+
+@pytest.fixture
+def logo(tmp_path, monkeypatch):
+    """An uploaded PNG, as (source path, stored base path, logo URL), with the uploads folder in tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(LOGO_UPLOAD_DIR)
+    buffer = BytesIO()
+    Image.new('RGB', (300, 300), (200, 30, 30)).save(buffer, 'PNG')
+    source = tmp_path / 'upload.png'
+    source.write_bytes(buffer.getvalue())
+    key = hashlib.sha256(buffer.getvalue()).hexdigest()
+    return str(source), os.path.join(LOGO_UPLOAD_DIR, key), f"/{LOGO_UPLOAD_DIR}/{key}.webp"
+
+def test_concurrent_uploads_of_same_logo(logo):
+    source, base_path, _ = logo
+    errors = []
+    start = threading.Barrier(8)
+
+    def upload():
+        start.wait()
+        try:
+            process_logo_image(source, base_path, 'png')
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=upload) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(os.listdir(LOGO_UPLOAD_DIR)) == sorted(
+        os.path.basename(f"{base_path}{suffix}.webp") for suffix in ('', '_64', '_32')
+    )
+
+def test_failed_write_leaves_no_temporary_file(tmp_path):
+    target = tmp_path / 'logo.webp'
+    target.mkdir()
+
+    with pytest.raises(OSError):
+        write_file(str(target), b'logo')
+
+    assert os.listdir(tmp_path) == ['logo.webp']
+
+def test_files_are_kept_until_last_reference_is_released(database, logo):
+    source, base_path, logo_url = logo
+    key = os.path.basename(base_path)
+    _retain_stored_logo(key, 'webp')
+    _retain_stored_logo(key, 'webp')
+    process_logo_image(source, base_path, 'png')
+
+    release_logo(logo_url)
+    assert database.session.get(StoredLogo, key).ref_count == 1
+    assert os.path.exists(logo_url[1:])
+
+    release_logo(logo_url)
+    assert database.session.get(StoredLogo, key) is None
+    assert os.listdir(LOGO_UPLOAD_DIR) == []
+
+def test_logo_uploaded_again_after_release_is_written_again(database, logo):
+    source, base_path, logo_url = logo
+    key = os.path.basename(base_path)
+    _retain_stored_logo(key, 'webp')
+    process_logo_image(source, base_path, 'png')
+    release_logo(logo_url)
+
+    assert _retain_stored_logo(key, 'webp') == 1
+    process_logo_image(source, base_path, 'png')
+    assert len(os.listdir(LOGO_UPLOAD_DIR)) == 3
+
+def test_uploads_for_one_subscription_release_each_replaced_logo(database, logo, make_subscription):
+    source, _, _ = logo
+    first, second = ('a' * 64, 'b' * 64)
+    for key in (first, second):
+        _retain_stored_logo(key, 'webp')
+    subscription = make_subscription(logo_url=None)
+    processed = Future()
+    processed.set_result({})
+
+    # The upload of the first logo has set it but not committed yet
+    with database.engine.connect() as other:
+        other.execute(
+            update(Subscription).where(Subscription.id == subscription.id)
+            .values(logo_url=f"/{LOGO_UPLOAD_DIR}/{first}.webp")
+        )
+        finishing = threading.Thread(
+            target=_finish_logo_upload,
+            args=(processed, subscription.id, source, f"/{LOGO_UPLOAD_DIR}/{second}.webp")
+        )
+        finishing.start()
+        finishing.join(0.5)
+        assert finishing.is_alive()
+        other.commit()
+    finishing.join()
+
+    # The second upload replaced the first logo, whose reference is gone
+    assert database.session.get(StoredLogo, first) is None
+    assert database.session.get(StoredLogo, second).ref_count == 1
+
+def test_upload_that_cannot_be_queued_drops_its_reference(database, logo, tmp_path, monkeypatch, make_subscription):
+    source, base_path, _ = logo
+    staging = tmp_path / 'staging'
+    monkeypatch.setitem(app.config, 'LOGO_UPLOAD_FOLDER', str(staging))
+
+    class BrokenPool:
+        def submit(self, *args):
+            raise RuntimeError('cannot schedule new futures after shutdown')
+
+    monkeypatch.setattr(utils, '_get_image_executor', BrokenPool)
+    subscription = make_subscription()
+
+    with open(source, 'rb') as f:
+        assert not handle_image_upload(FileStorage(f, filename='logo.png'), subscription.id)
+
+    assert database.session.get(StoredLogo, os.path.basename(base_path)) is None
+    assert os.listdir(staging) == []
@@ -0,0 +1,110 @@
+"""Reminder email batches against a local SMTP server."""
+import socket
+from datetime import datetime, timedelta
+import pytest
+import mailer
+from app import app
+from models import Subscription, User
+
+aiosmtpd_controller = pytest.importorskip('aiosmtpd.controller')
+
+class RecordingHandler:
+    """
+    Accepts every message, except for recipients listed in `rejections`,
+    which get the listed replies one RCPT at a time (the last one repeats).
+    """
+    def __init__(self):
+        self.messages = []
+        self.rejections = {}
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        replies = self.rejections.get(address)
+        if replies:
+            reply = replies.pop(0) if len(replies) > 1 else replies[0]
+            if reply:
+                return reply
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((session.peer, envelope.rcpt_tos))
+        return '250 Message accepted for delivery'
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    handler = RecordingHandler()
+    controller = aiosmtpd_controller.Controller(handler, hostname='127.0.0.1', port=_free_port())
+    controller.start()
+    mail_state = app.extensions['mail']
+    monkeypatch.setattr(mail_state, 'server', '127.0.0.1')
+    monkeypatch.setattr(mail_state, 'port', controller.port)
+    monkeypatch.setattr(mail_state, 'use_tls', False)
+    monkeypatch.setattr(mail_state, 'username', None)
+    monkeypatch.setattr(mail_state, 'suppress', False)
+    monkeypatch.setattr(mailer, 'RETRY_BACKOFF_SECONDS', 0)
+    monkeypatch.setitem(app.config, 'SERVER_NAME', 'subscriptions.example.com')
+    yield handler
+    controller.stop()
+
+def _deliveries(count):
+    deliveries = []
+    for i in range(count):
+        user = User(id=i, username=f'user{i}', email=f'user{i}@example.com')
+        subscription = Subscription(
+            id=i, name=f'Service {i}', amount=9.99, currency='EUR', billing_cycle='monthly',
+            next_payment_date=datetime.utcnow() + timedelta(days=3)
+        )
+        deliveries.append((user, subscription, 3))
+    return deliveries
+
+def _deliver(deliveries):
+    with app.app_context():
+        return mailer.deliver_reminder_emails(deliveries)
+
+def test_batch_is_sent_over_one_connection(smtp_server):
+    stats = _deliver(_deliveries(10))
+
+    assert stats['sent'] == 10
+    assert stats['failed'] == 0
+    assert stats['retry_later'] == []
+    assert stats['seconds'] > 0
+    assert stats['per_second'] > 0
+    assert 0 < stats['avg_latency_ms'] <= stats['max_latency_ms']
+    assert len(smtp_server.messages) == 10
+    assert len({peer for peer, _ in smtp_server.messages}) == 1
+
+def test_transient_rejection_is_retried(smtp_server):
+    smtp_server.rejections['user1@example.com'] = ['451 Try again later', None]
+
+    stats = _deliver(_deliveries(3))
+
+    assert stats['sent'] == 3
+    assert stats['retry_later'] == []
+    assert ['user1@example.com'] in [recipients for _, recipients in smtp_server.messages]
+
+def test_failures_are_counted_and_transient_ones_kept_for_later(smtp_server):
+    smtp_server.rejections['user0@example.com'] = ['451 Try again later']
+    smtp_server.rejections['user2@example.com'] = ['550 No such user']
+
+    stats = _deliver(_deliveries(4))
+
+    assert stats['sent'] == 2
+    assert stats['failed'] == 2
+    assert stats['retry_later'] == [0]
+    assert len(smtp_server.messages) == 2
+
+def test_render_errors_are_kept_for_later(smtp_server, monkeypatch):
+    # Without SERVER_NAME the link to the subscription can't be built
+    monkeypatch.setitem(app.config, 'SERVER_NAME', None)
+
+    stats = _deliver(_deliveries(2))
+
+    assert stats['sent'] == 0
+    assert stats['failed'] == 2
+    assert stats['retry_later'] == [0, 1]
+    assert smtp_server.messages == []
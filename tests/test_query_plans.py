@@ -0,0 +1,40 @@
+"""
+The dashboard and the reminder job must be served by their indexes.
+
+The test tables are tiny, so sequential scans are disabled: the planner then
+uses an index whenever one can answer the query, and an index that no longer
+matches the query shows up as a missing name in the plan.
+"""
+from datetime import datetime
+from sqlalchemy import text
+from models import ExchangeRate, Subscription
+from utils import due_reminders_query
+
+def _plan(database, query):
+    statement = query.statement if hasattr(query, 'statement') else query
+    compiled = statement.compile(dialect=database.engine.dialect)
+    connection = database.session.connection()
+    connection.execute(text("SET LOCAL enable_seqscan = off"))
+    rows = connection.exec_driver_sql(f"EXPLAIN {compiled.string}", compiled.params)
+    return '\n'.join(row[0] for row in rows)
+
+def test_dashboard_upcoming_payments_use_user_index(database, user):
+    # Same query as the dashboard's upcoming payments
+    query = Subscription.query.filter(
+        Subscription.user_id == user.id,
+        Subscription.next_payment_date.isnot(None),
+        Subscription.next_payment_date > datetime.utcnow(),
+        Subscription.is_active == True
+    ).order_by(Subscription.next_payment_date).limit(5)
+
+    assert 'ix_subscription_user_id_is_active_next_payment_date' in _plan(database, query)
+
+def test_due_reminders_use_unsent_index(database):
+    plan = _plan(database, due_reminders_query(datetime.utcnow()))
+
+    assert 'ix_reminder_unsent_subscription_id' in plan
+
+def test_exchange_rate_lookup_uses_pair_index(database):
+    query = ExchangeRate.query.filter_by(base_currency='USD', target_currency='EUR')
+
+    assert 'uq_exchange_rate_base_currency_target_currency' in _plan(database, query)
@@ -0,0 +1,55 @@
+"""Conversions at the exchange rates of past days."""
+from datetime import date, datetime, timedelta
+import pytest
+import utils
+from cost_engine import compute_past_spending
+from models import ExchangeRate, ExchangeRateHistory
+
+TODAY = date.today()
+
+@pytest.fixture
+def rates(database, monkeypatch):
+    """USD history with EUR at 0.5 from 40 days ago and 0.8 from 10 days ago; EUR is 0.9 today."""
+    monkeypatch.setattr(utils, '_rate_history_cache', {})
+    database.session.add_all([
+        ExchangeRateHistory(base_currency='USD', target_currency='EUR', rate_date=TODAY - timedelta(days=40), rate=0.5),
+        ExchangeRateHistory(base_currency='USD', target_currency='EUR', rate_date=TODAY - timedelta(days=10), rate=0.8),
+        ExchangeRate(base_currency='USD', target_currency='EUR', rate=0.9),
+        ExchangeRate(base_currency='EUR', target_currency='USD', rate=1 / 0.9),
+    ])
+    database.session.commit()
+    utils.load_rate_matrix()
+
+def test_past_days_carry_the_last_recorded_rate_forward(rates, monkeypatch):
+    days = [TODAY - timedelta(days=offset) for offset in (50, 30, 10, 5)]
+    queries = []
+    rows_between = utils._history_rows_between
+    monkeypatch.setattr(utils, '_history_rows_between', lambda *args: queries.append(args) or rows_between(*args))
+
+    first = utils.get_rates_as_of(['EUR'], 'USD', days)
+    second = utils.get_rates_as_of(['EUR'], 'USD', days)
+
+    assert first == second == {
+        ('EUR', days[1]): 2.0,
+        ('EUR', days[2]): 1.25,
+        ('EUR', days[3]): 1.25,
+    }
+    assert len(queries) == 1
+
+def test_today_and_later_use_the_current_rates(rates, monkeypatch):
+    monkeypatch.setattr(utils, '_history_rates_as_of', None)
+
+    assert utils.get_rates_as_of(['USD'], 'EUR', [TODAY, TODAY + timedelta(days=3)]) == {
+        ('USD', TODAY): 0.9,
+        ('USD', TODAY + timedelta(days=3)): 0.9,
+    }
+
+def test_past_spending_converts_each_payment_at_its_day(rates, user, make_subscription):
+    now = datetime.utcnow()
+    make_subscription(amount=10.0, currency='USD', billing_cycle='monthly', start_date=now - timedelta(days=35))
+    make_subscription(amount=99.0, currency='USD', billing_cycle='monthly', start_date=now, is_active=False)
+
+    # Paid 35 days ago at 0.5 and a month later, under 10 days ago, at 0.8
+    spent = compute_past_spending(user.id, 'EUR', now - timedelta(days=365), now)
+
+    assert spent == pytest.approx(10 * 0.5 + 10 * 0.8)
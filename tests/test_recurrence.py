@@ -0,0 +1,48 @@
+"""Payment dates on the real calendar, in Python and in SQL."""
+from datetime import datetime
+import pytest
+from models import Subscription
+from recurrence import next_occurrence, next_occurrence_sql
+
+# (start, billing cycle, after, next payment)
+CASES = [
+    # Month-end starts clamp to shorter months and come back afterwards
+    (datetime(2024, 1, 31), 'monthly', datetime(2024, 1, 31), datetime(2024, 2, 29)),
+    (datetime(2024, 1, 31), 'monthly', datetime(2024, 2, 29), datetime(2024, 3, 31)),
+    (datetime(2024, 1, 31), 'monthly', datetime(2024, 4, 1), datetime(2024, 4, 30)),
+    # A leap day start falls on Feb 28 until the next leap year
+    (datetime(2024, 2, 29), 'yearly', datetime(2024, 2, 29), datetime(2025, 2, 28)),
+    (datetime(2024, 2, 29), 'yearly', datetime(2026, 3, 1), datetime(2027, 2, 28)),
+    (datetime(2024, 2, 29), 'yearly', datetime(2027, 3, 1), datetime(2028, 2, 29)),
+    (datetime(2023, 11, 30), 'quarterly', datetime(2023, 11, 30), datetime(2024, 2, 29)),
+    (datetime(2023, 11, 30), 'quarterly', datetime(2024, 2, 29), datetime(2024, 5, 30)),
+    (datetime(2023, 8, 31), 'bi-annually', datetime(2023, 9, 1), datetime(2024, 2, 29)),
+    (datetime(2023, 12, 28, 9, 30), 'weekly', datetime(2023, 12, 30), datetime(2024, 1, 4, 9, 30)),
+    (datetime(2023, 12, 28, 9, 30), 'weekly', datetime(2024, 1, 4, 9, 30), datetime(2024, 1, 11, 9, 30)),
+    # The start date itself is the first payment
+    (datetime(2025, 6, 15), 'monthly', datetime(2025, 6, 1), datetime(2025, 6, 15)),
+]
+
+@pytest.mark.parametrize('start, billing_cycle, after, expected', CASES)
+def test_next_occurrence(start, billing_cycle, after, expected):
+    assert next_occurrence(start, billing_cycle, after) == expected
+
+def test_lifetime_has_no_next_payment():
+    assert next_occurrence(datetime(2024, 1, 31), 'lifetime', datetime(2024, 3, 1)) is None
+
+@pytest.mark.parametrize('after', sorted({case[2] for case in CASES}))
+def test_sql_matches_python(make_subscription, database, after):
+    subscriptions = {
+        make_subscription(start_date=start, billing_cycle=billing_cycle).id: (start, billing_cycle)
+        for start, billing_cycle, _, _ in CASES
+    }
+
+    rows = database.session.query(
+        Subscription.id,
+        next_occurrence_sql(Subscription.start_date, Subscription.billing_cycle, after)
+    ).all()
+
+    assert {id: payment for id, payment in rows} == {
+        id: next_occurrence(start, billing_cycle, after)
+        for id, (start, billing_cycle) in subscriptions.items()
+    }
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+import pytest
+import mailer
+from models import Reminder
+from utils import check_upcoming_reminders, reset_reminders_for_next_period
+
+@pytest.fixture
+def delivered(monkeypatch):
+    """Record the reminder emails instead of sending them."""
+    deliveries = []
+
+    def deliver_reminder_emails(batch):
+        deliveries.extend(batch)
+        return {'sent': len(batch), 'failed': 0, 'retry_later': []}
+
+    monkeypatch.setattr(mailer, 'deliver_reminder_emails', deliver_reminder_emails)
+    return deliveries
+
+def _reminder(database, subscription, days_before):
+    reminder = Reminder(user_id=subscription.user_id, subscription_id=subscription.id, days_before=days_before)
+    database.session.add(reminder)
+    database.session.commit()
+    return reminder
+
+def test_weekly_reminder_a_week_ahead_fires_every_period(database, make_subscription, delivered):
+    now = datetime.utcnow()
+    # Paid a week ago and due again in three days
+    subscription = make_subscription(
+        billing_cycle='weekly',
+        start_date=now - timedelta(days=4),
+        next_payment_date=now + timedelta(days=3),
+    )
+    reminder = _reminder(database, subscription, days_before=7)
+
+    check_upcoming_reminders()
+    assert len(delivered) == 1
+    database.session.refresh(reminder)
+    assert reminder.is_sent
+    assert reminder.sent_for_payment_date == subscription.next_payment_date
+
+    # The payment passes and the subscription rolls over to the next week.
+    # Its 7-day window has opened already, so the reminder is due right away.
+    subscription.start_date = now - timedelta(days=7, hours=1)
+    subscription.next_payment_date = now - timedelta(hours=1)
+    database.session.commit()
+
+    reset_reminders_for_next_period()
+    database.session.refresh(reminder)
+    database.session.refresh(subscription)
+    assert subscription.next_payment_date > now
+    assert not reminder.is_sent
+
+    check_upcoming_reminders()
+    assert len(delivered) == 2
+    database.session.refresh(reminder)
+    assert reminder.sent_for_payment_date == subscription.next_payment_date
+
+def test_sent_reminder_stays_sent_until_payment_date_moves(database, make_subscription, delivered):
+    subscription = make_subscription(next_payment_date=datetime.utcnow() + timedelta(days=2))
+    reminder = _reminder(database, subscription, days_before=7)
+
+    check_upcoming_reminders()
+    reset_reminders_for_next_period()
+    check_upcoming_reminders()
+
+    assert len(delivered) == 1
+    database.session.refresh(reminder)
+    assert reminder.is_sent
@@ -1,19 +1,27 @@
 """
 One-time script to update all subscription logos with favicons from their URLs.
+
+Each website is probed once, however many subscriptions point at it, and
+websites are probed concurrently (see favicon_prober.py). All changed logos
+are written back with one bulk UPDATE.
 """
 import os
 import logging
 import sys
-import requests
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import create_engine, select, update, Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey
 from sqlalchemy.orm import sessionmaker, Session, scoped_session
 from datetime import datetime
+from favicon_prober import FaviconProber, google_favicon, split_site
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Websites probed at the same time, and requests in flight per website
+PROBE_WORKERS = 16
+PER_HOST_LIMIT = 2
+
 # Set up database connection
 DB_URL = os.environ.get("DATABASE_URL")
 if not DB_URL:
@@ -45,77 +53,45 @@ class Subscription(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-# Define the favicon function directly to avoid import issues
-def get_favicon_from_url(service_name, url):
-    """Try to get favicon directly from a URL."""
-    if not url:
-        return None
-        
-    try:
-        # Parse the URL to get the domain
-        from urllib.parse import urlparse
-        parsed_url = urlparse(url)
-        
-        # Only continue if we have a valid domain
-        if parsed_url.netloc:
-            # Try common favicon locations
-            favicon_urls = [
-                f"{parsed_url.scheme}://{parsed_url.netloc}/favicon.ico",
-                f"{parsed_url.scheme}://{parsed_url.netloc}/favicon.png",
-                f"{parsed_url.scheme}://{parsed_url.netloc}/apple-touch-icon.png",
-                f"{parsed_url.scheme}://{parsed_url.netloc}/apple-icon.png",
-            ]
-            
-            # Use Google's favicon service as a fallback
-            google_favicon = f"https://www.google.com/s2/favicons?domain={parsed_url.netloc}&sz=64"
-            
-            # Try direct favicon URLs first
-            for favicon_url in favicon_urls:
-                try:
-                    response = requests.head(favicon_url, timeout=2)
-                    if response.status_code == 200:
-                        return favicon_url
-                except:
-                    pass
-            
-            # Fallback to Google's favicon service
-            return google_favicon
-    except Exception as e:
-        logger.error(f"Error fetching favicon for {url}: {str(e)}")
-    
-    return None
-
-def update_subscription_favicons():
+def update_subscription_favicons(prober=None):
     """Update all subscription logos to use favicons from URLs if available."""
     session = Session()
+    if prober is None:
+        prober = FaviconProber(max_workers=PROBE_WORKERS, per_host=PER_HOST_LIMIT)
     
     try:
         # Get all subscriptions that have a URL set
-        subscriptions = session.query(Subscription).filter(Subscription.url.isnot(None)).all()
+        subscriptions = session.execute(
+            select(Subscription.id, Subscription.name, Subscription.url, Subscription.logo_url)
+            .where(Subscription.url.isnot(None), Subscription.url != '')
+        ).all()
         
-        logger.info(f"Found {len(subscriptions)} subscriptions with URLs to check for favicon updates")
+        # Skip URLs without a domain, and probe every domain only once
+        sites = {subscription.id: split_site(subscription.url) for subscription in subscriptions}
+        domains = {site[1] for site in sites.values() if site}
+        logger.info(f"Found {len(subscriptions)} subscriptions with URLs on {len(domains)} websites to check for favicon updates")
         
-        # Counter for tracking updates
-        update_count = 0
+        favicons = prober.probe_many(site for site in sites.values() if site)
         
+        # Update if favicon found and different from current logo
+        updates = []
         for subscription in subscriptions:
-            # Skip if no URL provided
-            if not subscription.url:
+            site = sites[subscription.id]
+            if not site:
                 continue
-                
-            # Get favicon from URL
-            favicon_url = get_favicon_from_url(subscription.name, subscription.url)
             
-            # Update if favicon found and different from current logo
-            if favicon_url and favicon_url != subscription.logo_url:
-                old_logo = subscription.logo_url or 'None'
-                subscription.logo_url = favicon_url
-                update_count += 1
-                logger.info(f"Updated logo for '{subscription.name}': {old_logo} -> {favicon_url}")
+            # Fallback to Google's favicon service
+            favicon_url = favicons[site[1]] or google_favicon(site[1])
+            if favicon_url != subscription.logo_url:
+                updates.append({'id': subscription.id, 'logo_url': favicon_url})
+                logger.info(f"Updated logo for '{subscription.name}': {subscription.logo_url or 'None'} -> {favicon_url}")
+        
+        if updates:
+            session.execute(update(Subscription), updates)
         
         # Commit changes
         session.commit()
-        logger.info(f"Successfully updated {update_count} subscription logos with favicons")
+        logger.info(f"Successfully updated {len(updates)} subscription logos with favicons")
     
     except Exception as e:
         session.rollback()
@@ -124,4 +100,4 @@ def update_subscription_favicons():
         session.close()
 
 if __name__ == "__main__":
-    update_subscription_favicons()
\ No newline at end of file
+    update_subscription_favicons()
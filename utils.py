@@ -1,18 +1,180 @@
+import hashlib
+import re
 import requests
 import logging
-from datetime import datetime, timedelta
-from flask import render_template
-from flask_mail import Message
-from app import app, db, mail
-from models import ExchangeRate
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from requests.adapters import HTTPAdapter
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app import app, db
+from models import ExchangeRate, ExchangeRateHistory, FaviconCache, StoredLogo
+from recurrence import CYCLE_MONTHS, next_occurrence_sql
+from logo_catalog import DEFAULT_LOGO, catalog as logo_catalog
+from favicon_prober import FaviconProber, google_favicon, split_site
+from image_pipeline import logo_file_paths, process_logo_image
 from flask_login import current_user
 
 logger = logging.getLogger(__name__)
 
+# How often (in seconds) a worker re-checks the exchange_rate version stamp.
+# Other gunicorn workers may have refreshed the table since our last load.
+RATE_MATRIX_CHECK_INTERVAL = 60
+
+# Process-wide exchange rate matrix keyed by (base_currency, target_currency)
+_rate_matrix = {}
+_rate_matrix_version = None
+_rate_matrix_checked_at = 0.0
+_rate_matrix_lock = threading.Lock()
+
+# Historic cross rates keyed by ((from_currency, to_currency), day), None
+# when the history doesn't reach back that far. Only days before today are
+# cached: their history rows no longer change. Today and later use the matrix.
+_rate_history_cache = {}
+
+# (connect, read) timeouts in seconds for exchange rate API calls
+EXCHANGE_RATE_API_TIMEOUT = (3.05, 10)
+
+# Significant digits kept for every stored exchange rate
+RATE_SIGNIFICANT_DIGITS = 6
+
+# How long a favicon probe result is trusted. Websites without a direct
+# favicon (or that didn't answer) are probed again sooner.
+FAVICON_TTL = timedelta(days=30)
+FAVICON_NEGATIVE_TTL = timedelta(days=1)
+
+# Favicon lookups kept in process memory, in front of the favicon_cache table.
+# Maps domain -> (favicon_url or None, expires_at), least recently used first.
+FAVICON_MEMORY_CACHE_SIZE = 1024
+_favicon_cache = OrderedDict()
+_favicon_cache_lock = threading.Lock()
+
+# Uploaded logos are served from here
+LOGO_UPLOAD_DIR = 'static/uploads'
+
+# URL of a stored logo file: SHA-256 of the upload, optional size suffix
+STORED_LOGO_URL = re.compile(rf'^/{LOGO_UPLOAD_DIR}/(?P<key>[0-9a-f]{{64}})(?:_\d+)?\.(?:webp|svg)$')
+
+# Largest accepted logo upload, and the block size it's copied to disk in
+MAX_LOGO_UPLOAD_BYTES = 10 * 1024 * 1024
+UPLOAD_BLOCK_SIZE = 64 * 1024
+
+# Worker processes decoding and encoding uploaded logos, started on first upload
+IMAGE_WORKERS = 2
+_image_executor = None
+_image_executor_lock = threading.Lock()
+
+# Saves processed logos to the database. The process pool runs done callbacks
+# on its management thread, which shouldn't wait on the database.
+_logo_upload_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='logo-upload')
+
+# Shared HTTP session so outbound calls reuse pooled keep-alive connections
+http_session = requests.Session()
+http_session.mount('https://', HTTPAdapter(pool_connections=8, pool_maxsize=8))
+http_session.mount('http://', HTTPAdapter(pool_connections=8, pool_maxsize=8))
+
+# Favicon probes share the pooled session, with at most 8 requests in flight
+_favicon_prober = FaviconProber(session=http_session, max_workers=8)
+
+def _fetch_rates_for_base(base, api_key):
+    """Fetch the latest rates for one base currency. Returns the rates dict or None."""
+    url = f"{app.config['EXCHANGE_RATE_API_URL']}{base}"
+    logger.info(f"Fetching rates for {base} from {url}")
+    
+    try:
+        response = http_session.get(
+            url,
+            params={'apikey': api_key},
+            timeout=EXCHANGE_RATE_API_TIMEOUT
+        )
+    except requests.RequestException as e:
+        logger.error(f"Failed to fetch exchange rates for {base}: {str(e)}")
+        return None
+    
+    if response.status_code != 200:
+        logger.error(f"Failed to fetch exchange rates for {base}: {response.status_code}")
+        logger.error(f"Response content: {response.text}")
+        return None
+    
+    return response.json().get('rates', {})
+
+def upsert_exchange_rates(rates):
+    """
+    Insert or update (base, target, rate) tuples with a single
+    INSERT ... ON CONFLICT statement and commit.
+    """
+    now = datetime.utcnow()
+    stmt = pg_insert(ExchangeRate).values([
+        {
+            'base_currency': base,
+            'target_currency': target,
+            'rate': rate,
+            'updated_at': now
+        }
+        for base, target, rate in rates
+    ])
+    stmt = stmt.on_conflict_do_update(
+        constraint='uq_exchange_rate_base_currency_target_currency',
+        set_={'rate': stmt.excluded.rate, 'updated_at': stmt.excluded.updated_at}
+    )
+    
+    db.session.execute(stmt)
+    db.session.commit()
+
+def record_rate_history(base, base_rates, currencies, day=None):
+    """
+    Add the day's rates to the exchange rate history, without committing.
+    Only rates quoted against `base` are stored (one row per currency per
+    day); cross rates are derived when they are looked up. A later fetch on
+    the same day replaces that day's rows, earlier days are never touched.
+    """
+    if day is None:
+        day = date.today()
+    
+    rows = [
+        {
+            'base_currency': base,
+            'target_currency': currency,
+            'rate_date': day,
+            'rate': base_rates[currency]
+        }
+        for currency in currencies
+        if currency != base and base_rates.get(currency)
+    ]
+    if not rows:
+        return
+    
+    stmt = pg_insert(ExchangeRateHistory).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['base_currency', 'target_currency', 'rate_date'],
+        set_={'rate': stmt.excluded.rate}
+    )
+    db.session.execute(stmt)
+
+def cross_rates(base_rates, currencies):
+    """
+    Derive every (base, target, rate) pair between `currencies` from one set
+    of rates quoted against a single base currency. Rates are rounded to
+    RATE_SIGNIFICANT_DIGITS so all pairs carry the same relative precision.
+    """
+    available = [currency for currency in currencies if base_rates.get(currency)]
+    
+    return [
+        (base, target, float(f"{base_rates[target] / base_rates[base]:.{RATE_SIGNIFICANT_DIGITS}g}"))
+        for base in available
+        for target in available
+        if target != base
+    ]
+
 def fetch_exchange_rates():
     """
     Fetch the latest exchange rates from an external API and update the database.
-    Supports USD, EUR, CZK, and PLN.
+    One request against EXCHANGE_RATE_BASE_CURRENCY is enough: the rates
+    between all SUPPORTED_CURRENCIES are derived from it locally.
     """
     try:
         # Get API key from current user
@@ -26,54 +188,31 @@ def fetch_exchange_rates():
             add_default_exchange_rates()
             return
         
-        # Using Exchange Rate API (free tier)
-        base_url = "https://open.er-api.com/v6/latest/"
+        currencies = app.config['SUPPORTED_CURRENCIES']
+        base = app.config['EXCHANGE_RATE_BASE_CURRENCY']
         
-        # Fetch rates for each base currency
-        base_currencies = ['USD', 'EUR', 'CZK', 'PLN']
+        base_rates = _fetch_rates_for_base(base, api_key)
         
-        for base in base_currencies:
-            url = f"{base_url}{base}?apikey={api_key}"
-            logger.info(f"Fetching rates for {base} from {url}")
-            response = requests.get(url)
+        if base_rates:
+            # The API may omit the base itself from its own rates
+            base_rates = {**base_rates, base: 1.0}
+            rates = cross_rates(base_rates, currencies)
             
-            if response.status_code == 200:
-                data = response.json()
-                rates = data.get('rates', {})
-                logger.info(f"Received rates for {base}: {rates}")
+            missing = [currency for currency in currencies if not base_rates.get(currency)]
+            if missing:
+                logger.warning(f"No {base} rate returned for: {', '.join(missing)}")
+            
+            if rates:
+                # Committed together with the current rates below
+                record_rate_history(base, base_rates, currencies)
+                upsert_exchange_rates(rates)
+                logger.info(f"Updated {len(rates)} exchange rates from {base}")
                 
-                # Update rates for each target currency
-                for target in base_currencies:
-                    if target != base and target in rates:
-                        rate_value = rates[target]
-                        logger.info(f"Updating rate {base}->{target}: {rate_value}")
-                        
-                        # Check if rate exists
-                        exchange_rate = ExchangeRate.query.filter_by(
-                            base_currency=base,
-                            target_currency=target
-                        ).first()
-                        
-                        if exchange_rate:
-                            exchange_rate.rate = rate_value
-                            exchange_rate.updated_at = datetime.utcnow()
-                            logger.info(f"Updated existing rate {base}->{target}")
-                        else:
-                            exchange_rate = ExchangeRate(
-                                base_currency=base,
-                                target_currency=target,
-                                rate=rate_value
-                            )
-                            db.session.add(exchange_rate)
-                            logger.info(f"Added new rate {base}->{target}")
-                
-                db.session.commit()
-                logger.info(f"Exchange rates for {base} updated successfully")
-            else:
-                logger.error(f"Failed to fetch exchange rates for {base}: {response.status_code}")
-                logger.error(f"Response content: {response.text}")
+                # Rebuild the in-memory matrix once, after the rates were committed
+                load_rate_matrix()
                 
     except Exception as e:
+        db.session.rollback()
         logger.error(f"Error updating exchange rates: {str(e)}")
         
     # If no exchange rates were fetched, add default ones
@@ -105,51 +244,230 @@ def add_default_exchange_rates():
         {'base': 'PLN', 'target': 'CZK', 'rate': 5.79}
     ]
     
-    for rate_data in default_rates:
-        exchange_rate = ExchangeRate(
-            base_currency=rate_data['base'],
-            target_currency=rate_data['target'],
-            rate=rate_data['rate']
-        )
-        db.session.add(exchange_rate)
+    # Only fill in missing pairs, never overwrite rates fetched from the API
+    db.session.execute(
+        pg_insert(ExchangeRate)
+        .values([
+            {
+                'base_currency': rate_data['base'],
+                'target_currency': rate_data['target'],
+                'rate': rate_data['rate']
+            }
+            for rate_data in default_rates
+        ])
+        .on_conflict_do_nothing(constraint='uq_exchange_rate_base_currency_target_currency')
+    )
     
     db.session.commit()
     logger.info("Default exchange rates added")
+    
+    load_rate_matrix()
 
-def convert_currency(amount, from_currency, to_currency):
-    """Convert amount from one currency to another using stored exchange rates."""
+def _get_rate_matrix_version():
+    """
+    Return a cheap version stamp for the exchange_rate table.
+    Every refresh either inserts rows or bumps updated_at, so the pair
+    (row count, latest updated_at) changes whenever any worker rewrites rates.
+    """
+    count, latest = db.session.query(
+        func.count(ExchangeRate.id),
+        func.max(ExchangeRate.updated_at)
+    ).one()
+    return (count, latest)
+
+def load_rate_matrix():
+    """Rebuild the in-memory exchange rate matrix with a single bulk query."""
+    global _rate_matrix, _rate_matrix_version, _rate_matrix_checked_at
+    
+    with _rate_matrix_lock:
+        rows = db.session.query(
+            ExchangeRate.base_currency,
+            ExchangeRate.target_currency,
+            ExchangeRate.rate,
+            ExchangeRate.updated_at
+        ).order_by(ExchangeRate.id).all()
+        
+        # Later rows win, so the most recently inserted rate is used for a pair
+        matrix = {(base, target): rate for base, target, rate, _ in rows}
+        latest = max((row.updated_at for row in rows if row.updated_at), default=None)
+        
+        # Swap the whole dict so readers never see a half-built matrix
+        _rate_matrix = matrix
+        _rate_matrix_version = (len(rows), latest)
+        _rate_matrix_checked_at = time.monotonic()
+        logger.info(f"Loaded {len(matrix)} exchange rates into memory")
+        
+        return matrix
+
+def get_rate_matrix():
+    """
+    Return the process-wide exchange rate matrix, keyed by (base, target).
+    The matrix is loaded lazily and reloaded when the version stamp in the
+    database shows that another process has refreshed the rates.
+    """
+    global _rate_matrix_checked_at
+    
+    if _rate_matrix_version is None:
+        return load_rate_matrix()
+    
+    now = time.monotonic()
+    if now - _rate_matrix_checked_at >= RATE_MATRIX_CHECK_INTERVAL:
+        _rate_matrix_checked_at = now
+        if _get_rate_matrix_version() != _rate_matrix_version:
+            return load_rate_matrix()
+    
+    return _rate_matrix
+
+def get_rate_matrix_updated_at():
+    """Return the latest updated_at among the exchange rates in the current matrix."""
+    get_rate_matrix()
+    return _rate_matrix_version[1]
+
+def get_rate(from_currency, to_currency):
+    """Return the current exchange rate between two currencies, or None if there is no conversion path."""
     if from_currency == to_currency:
-        return amount
+        return 1.0
+    
+    rates = get_rate_matrix()
     
     # Get exchange rate
-    exchange_rate = ExchangeRate.query.filter_by(
-        base_currency=from_currency,
-        target_currency=to_currency
-    ).first()
+    rate = rates.get((from_currency, to_currency))
     
-    if exchange_rate:
-        return amount * exchange_rate.rate
+    if rate is not None:
+        return rate
     
     # If direct conversion not found, try via USD
-    usd_from_rate = ExchangeRate.query.filter_by(
-        base_currency=from_currency,
-        target_currency='USD'
-    ).first()
-    
-    usd_to_rate = ExchangeRate.query.filter_by(
-        base_currency='USD',
-        target_currency=to_currency
-    ).first()
+    usd_from_rate = rates.get((from_currency, 'USD'))
+    usd_to_rate = rates.get(('USD', to_currency))
     
     if usd_from_rate and usd_to_rate:
-        # Convert to USD first, then to target currency
-        usd_amount = amount * (1 / usd_from_rate.rate)
-        return usd_amount * usd_to_rate.rate
+        return usd_to_rate / usd_from_rate
+    
+    return None
+
+def convert_currency(amount, from_currency, to_currency):
+    """Convert amount from one currency to another using stored exchange rates."""
+    if from_currency == to_currency:
+        return amount
+    
+    rate = get_rate(from_currency, to_currency)
+    if rate is not None:
+        return amount * rate
     
     # If no conversion path found, return original amount
     logger.warning(f"Could not find exchange rate from {from_currency} to {to_currency}")
     return amount
 
+def _history_rates_as_of(base, currencies, day):
+    """
+    Return the latest recorded rate on or before `day` for each currency,
+    quoted against `base`, using one DISTINCT ON query over the history index.
+    """
+    rows = db.session.query(
+        ExchangeRateHistory.target_currency,
+        ExchangeRateHistory.rate
+    ).filter(
+        ExchangeRateHistory.base_currency == base,
+        ExchangeRateHistory.target_currency.in_(currencies),
+        ExchangeRateHistory.rate_date <= day
+    ).order_by(
+        ExchangeRateHistory.target_currency,
+        ExchangeRateHistory.rate_date.desc()
+    ).distinct(ExchangeRateHistory.target_currency).all()
+    
+    rates = dict(rows)
+    rates[base] = 1.0
+    return rates
+
+def _history_rows_between(base, currencies, first_day, last_day):
+    """Return (rate_date, currency, rate) history rows for the days from first_day to last_day, oldest first."""
+    return db.session.query(
+        ExchangeRateHistory.rate_date,
+        ExchangeRateHistory.target_currency,
+        ExchangeRateHistory.rate
+    ).filter(
+        ExchangeRateHistory.base_currency == base,
+        ExchangeRateHistory.target_currency.in_(currencies),
+        ExchangeRateHistory.rate_date.between(first_day, last_day)
+    ).order_by(ExchangeRateHistory.rate_date).all()
+
+def get_rates_as_of(currencies, to_currency, days):
+    """
+    Return {(currency, day): rate} converting each of `currencies` to
+    `to_currency` as of each of `days` (dates or datetimes). Pairs without
+    history that far back are left out.
+
+    Today and later use the current rate matrix. Past days missing from the
+    cache are loaded together: the rates as of the first missing day plus
+    every history row up to the last one, so a whole report costs two queries.
+    """
+    days = {day.date() if isinstance(day, datetime) else day for day in days}
+    today = date.today()
+    rates = {}
+    missing = {}
+    
+    for currency in set(currencies):
+        for day in days:
+            if currency == to_currency:
+                rates[(currency, day)] = 1.0
+            elif day >= today:
+                rate = get_rate(currency, to_currency)
+                if rate is not None:
+                    rates[(currency, day)] = rate
+            elif ((currency, to_currency), day) in _rate_history_cache:
+                rate = _rate_history_cache[((currency, to_currency), day)]
+                if rate is not None:
+                    rates[(currency, day)] = rate
+            else:
+                missing.setdefault(day, []).append(currency)
+    
+    if not missing:
+        return rates
+    
+    base = app.config['EXCHANGE_RATE_BASE_CURRENCY']
+    wanted = sorted({currency for day_currencies in missing.values() for currency in day_currencies} | {to_currency})
+    missing_days = sorted(missing)
+    
+    # Walk the history rows day by day, carrying the latest rate forward
+    known = _history_rates_as_of(base, wanted, missing_days[0])
+    rows = iter(_history_rows_between(base, wanted, missing_days[0] + timedelta(days=1), missing_days[-1]))
+    row = next(rows, None)
+    for day in missing_days:
+        while row is not None and row.rate_date <= day:
+            known[row.target_currency] = row.rate
+            row = next(rows, None)
+        for currency in missing[day]:
+            rate = None
+            if known.get(currency) and known.get(to_currency):
+                rate = float(f"{known[to_currency] / known[currency]:.{RATE_SIGNIFICANT_DIGITS}g}")
+                rates[(currency, day)] = rate
+            _rate_history_cache[((currency, to_currency), day)] = rate
+    
+    return rates
+
+def get_rate_as_of(from_currency, to_currency, day):
+    """
+    Return the exchange rate from one currency to another as it was on `day`
+    (a date or datetime), or None if the history doesn't reach back that far.
+    """
+    if isinstance(day, datetime):
+        day = day.date()
+    return get_rates_as_of([from_currency], to_currency, [day]).get((from_currency, day))
+
+def convert_currency_at(amount, from_currency, to_currency, day):
+    """
+    Convert amount using the exchange rate in effect on `day`.
+    Falls back to the current rate when there is no history for that day.
+    """
+    if from_currency == to_currency:
+        return amount
+    
+    rate = get_rate_as_of(from_currency, to_currency, day)
+    if rate is None:
+        return convert_currency(amount, from_currency, to_currency)
+    
+    return amount * rate
+
 def format_currency(amount, currency):
     """Format amount with currency symbol."""
     currency_symbols = {
@@ -166,175 +484,265 @@ def format_currency(amount, currency):
     else:
         return f"{symbol}{amount:.2f}"
 
+def _reminder_window_start():
+    """SQL expression for the moment a reminder becomes due: payment date minus days_before."""
+    from models import Subscription, Reminder
+    
+    return Subscription.next_payment_date - func.make_interval(0, 0, 0, Reminder.days_before)
+
+def due_reminders_query(now):
+    """
+    Query the reminders that are due at `now`, together with their
+    subscription and user, as (reminder, subscription, user) rows.
+    """
+    from models import Subscription, Reminder, User
+    
+    return db.session.query(Reminder, Subscription, User).join(
+        Subscription, Reminder.subscription_id == Subscription.id
+    ).join(
+        User, Reminder.user_id == User.id
+    ).filter(
+        Reminder.is_sent == False,
+        Subscription.is_active == True,
+        Subscription.next_payment_date.isnot(None),
+        _reminder_window_start() <= now
+    )
+
 def check_upcoming_reminders():
     """
     Check for subscriptions with upcoming payments and send reminders.
     This function is called by the scheduler.
     """
-    from models import Subscription, Reminder, User
+    from models import Subscription, Reminder
     
-    # Get all active reminders
-    reminders = Reminder.query.filter_by(is_sent=False).all()
+    now = datetime.utcnow()
     
-    for reminder in reminders:
-        subscription = Subscription.query.get(reminder.subscription_id)
-        user = User.query.get(reminder.user_id)
-        
-        if not subscription or not user or not subscription.is_active:
-            continue
-        
-        if not subscription.next_payment_date:
-            continue
-        
-        # Check if it's time to send the reminder
-        days_until_payment = (subscription.next_payment_date - datetime.utcnow()).days
-        
-        if days_until_payment <= reminder.days_before:
-            # Send email reminder
-            if reminder.email_notification and user.email:
-                send_reminder_email(user, subscription, days_until_payment)
-            
-            # Mark reminder as sent
-            reminder.is_sent = True
-            db.session.commit()
-            
-            logger.info(f"Reminder sent for subscription {subscription.name} to user {user.username}")
-
-def send_reminder_email(user, subscription, days_until_payment):
-    """Send a reminder email for an upcoming subscription payment."""
-    try:
-        subject = f"Reminder: {subscription.name} payment due in {days_until_payment} days"
-        
-        msg = Message(
-            subject=subject,
-            recipients=[user.email]
+    # Select only the reminders that are due in a single joined query
+    due_reminders = due_reminders_query(now).all()
+    
+    if not due_reminders:
+        return
+    
+    from mailer import deliver_reminder_emails
+    
+    # Send all email reminders as one batch over a single SMTP connection
+    email_reminders = [
+        (reminder, subscription, user)
+        for reminder, subscription, user in due_reminders
+        if reminder.email_notification and user.email
+    ]
+    stats = deliver_reminder_emails([
+        (user, subscription, (subscription.next_payment_date - now).days)
+        for _, subscription, user in email_reminders
+    ])
+    
+    # Reminders that hit a transient delivery error stay unsent for the next run
+    retry_ids = {email_reminders[index][0].id for index in stats['retry_later']}
+    sent_ids = [reminder.id for reminder, _, _ in due_reminders if reminder.id not in retry_ids]
+    
+    # Mark all processed reminders as sent at once, remembering which
+    # payment they were sent for
+    if sent_ids:
+        db.session.execute(
+            update(Reminder)
+            .where(
+                Reminder.id.in_(sent_ids),
+                Reminder.subscription_id == Subscription.id
+            )
+            .values(is_sent=True, sent_for_payment_date=Subscription.next_payment_date)
+            .execution_options(synchronize_session=False)
         )
-        
-        msg.html = render_template(
-            'email/payment_reminder.html',
-            user=user,
-            subscription=subscription,
-            days_until_payment=days_until_payment,
-            amount=format_currency(subscription.amount, subscription.currency)
+    db.session.commit()
+    
+    logger.info(f"Processed {len(sent_ids)} due reminders, {len(retry_ids)} deferred to the next run")
+
+def roll_forward_payment_dates(now=None):
+    """
+    Advance next_payment_date for every active subscription whose payment
+    date has passed, using a single set-based UPDATE.
+    Returns the ids of the subscriptions that were rolled forward.
+    """
+    from models import Subscription
+    
+    if now is None:
+        now = datetime.utcnow()
+    
+    result = db.session.execute(
+        update(Subscription)
+        .where(
+            Subscription.is_active == True,
+            Subscription.billing_cycle.in_(['weekly', *CYCLE_MONTHS]),
+            or_(
+                Subscription.next_payment_date.is_(None),
+                Subscription.next_payment_date < now
+            )
         )
-        
-        mail.send(msg)
-        logger.info(f"Reminder email sent to {user.email} for {subscription.name}")
-    except Exception as e:
-        logger.error(f"Failed to send reminder email: {str(e)}")
+        .values(next_payment_date=next_occurrence_sql(
+            Subscription.start_date,
+            Subscription.billing_cycle,
+            now
+        ))
+        .returning(Subscription.id)
+        .execution_options(synchronize_session=False)
+    )
+    
+    return [row[0] for row in result]
 
 def reset_reminders_for_next_period():
     """Reset reminders for subscriptions that have been renewed."""
     from models import Subscription, Reminder
     
-    # Get all subscriptions
-    subscriptions = Subscription.query.filter_by(is_active=True).all()
+    now = datetime.utcnow()
+    renewed_ids = roll_forward_payment_dates(now)
     
-    for subscription in subscriptions:
-        # Calculate next payment date
-        next_payment_date = subscription.calculate_next_payment_date()
-        
-        if next_payment_date:
-            # Reset reminders for this subscription
-            reminders = Reminder.query.filter_by(subscription_id=subscription.id).all()
-            
-            for reminder in reminders:
-                reminder.is_sent = False
-            
-            db.session.commit()
+    # A reminder sent for an earlier payment date has to fire again for the
+    # new one. Its window may have opened already: a weekly subscription's
+    # 7-day reminder is due as soon as the previous payment has passed.
+    # Reminders sent before the payment date was recorded fall back to
+    # re-arming once their window lies in the future.
+    result = db.session.execute(
+        update(Reminder)
+        .where(
+            Reminder.subscription_id == Subscription.id,
+            Reminder.is_sent == True,
+            or_(
+                Subscription.next_payment_date > Reminder.sent_for_payment_date,
+                and_(
+                    Reminder.sent_for_payment_date.is_(None),
+                    _reminder_window_start() > now
+                )
+            )
+        )
+        .values(is_sent=False)
+        .execution_options(synchronize_session=False)
+    )
+    
+    db.session.commit()
+    logger.info(f"Rolled forward {len(renewed_ids)} subscriptions and reset {result.rowcount} reminders")
 
-def get_logo_url_for_service(service_name, url=None):
+def _remember_favicon(domain, favicon_url, expires_at):
+    with _favicon_cache_lock:
+        _favicon_cache[domain] = (favicon_url, expires_at)
+        _favicon_cache.move_to_end(domain)
+        while len(_favicon_cache) > FAVICON_MEMORY_CACHE_SIZE:
+            _favicon_cache.popitem(last=False)
+
+def _cached_favicons(domains, now):
+    """Return {domain: favicon_url or None} for domains with an unexpired cached result."""
+    found = {}
+    with _favicon_cache_lock:
+        for domain in domains:
+            cached = _favicon_cache.get(domain)
+            if cached and cached[1] > now:
+                _favicon_cache.move_to_end(domain)
+                found[domain] = cached[0]
+    
+    missing = [domain for domain in domains if domain not in found]
+    if missing:
+        rows = db.session.execute(
+            select(FaviconCache.domain, FaviconCache.favicon_url, FaviconCache.expires_at)
+            .where(FaviconCache.domain.in_(missing), FaviconCache.expires_at > now)
+        )
+        for row in rows:
+            found[row.domain] = row.favicon_url
+            _remember_favicon(row.domain, row.favicon_url, row.expires_at)
+    return found
+
+def _store_favicons(results, now):
     """
-    Get a logo URL for a specific service based on its name.
-    If no match is found and URL is provided, attempt to get favicon from the website.
+    Record probe results, {domain: favicon_url or None}, with one upsert.
+    Runs on its own connection, outside the caller's transaction.
     """
-    # Dictionary mapping service names to their logo URLs
-    # Using popular service logos from CDNs for recognizable services
-    service_logos = {
-        'netflix': 'https://upload.wikimedia.org/wikipedia/commons/0/08/Netflix_2015_logo.svg',
-        'spotify': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/spotify/spotify-original.svg',
-        'apple': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/apple/apple-original.svg',
-        'apple tv': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/apple/apple-original.svg',
-        'apple music': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/apple/apple-original.svg',
-        'amazon': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/amazonwebservices/amazonwebservices-original.svg',
-        'amazon prime': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/amazonwebservices/amazonwebservices-original.svg',
-        'google': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/google/google-original.svg',
-        'google one': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/google/google-original.svg',
-        'youtube': 'https://www.youtube.com/favicon.ico',
-        'youtube premium': 'https://www.youtube.com/favicon.ico',
-        'github': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/github/github-original.svg',
-        'replit': 'https://replit.com/public/icons/apple-icon-180.png',
-        'slack': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/slack/slack-original.svg',
-        'microsoft': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/microsoft/microsoft-original.svg',
-        'office 365': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/microsoft/microsoft-original.svg',
-        'xbox': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/microsoft/microsoft-original.svg',
-        'dropbox': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/dropbox/dropbox-original.svg',
-        'adobe': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/adobe/adobe-original.svg',
-        'photoshop': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/photoshop/photoshop-plain.svg',
-        'digitalocean': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/digitalocean/digitalocean-original.svg',
-        'hulu': 'https://upload.wikimedia.org/wikipedia/commons/e/e4/Hulu_Logo.svg',
-        'disney+': 'https://upload.wikimedia.org/wikipedia/commons/3/3e/Disney%2B_logo.svg',
-        'twitch': 'https://cdn.jsdelivr.net/gh/devicons/devicon/icons/twitch/twitch-original.svg',
-        'bolt': 'https://www.google.com/s2/favicons?domain=bolt.new&sz=64',
-        'cursor': 'https://www.google.com/s2/favicons?domain=cursor.sh&sz=64',
-        'gitlab': 'https://gitlab.com/favicon.ico',
-        'granola': 'https://www.google.com/s2/favicons?domain=granola.ai&sz=64',
-        'linear': 'https://www.google.com/s2/favicons?domain=linear.app&sz=64',
-        'lovable': 'https://www.google.com/s2/favicons?domain=lovable.dev&sz=64',
-        'notability': 'https://notability.com/favicon.ico',
-        'notion': 'https://www.notion.so/images/favicon.ico',
-        'perplexity': 'https://www.perplexity.ai/favicon.ico',
-        'perplexity ai': 'https://www.perplexity.ai/favicon.ico',
-        'superhuman': 'https://www.google.com/s2/favicons?domain=superhuman.com&sz=64',
-        'todoist': 'https://todoist.com/favicon.ico',
-        'v0': 'https://www.google.com/s2/favicons?domain=v0.dev&sz=64',
-    }
+    rows = []
+    for domain, favicon_url in results.items():
+        expires_at = now + (FAVICON_TTL if favicon_url else FAVICON_NEGATIVE_TTL)
+        rows.append({'domain': domain, 'favicon_url': favicon_url, 'checked_at': now, 'expires_at': expires_at})
+        _remember_favicon(domain, favicon_url, expires_at)
+    
+    stmt = pg_insert(FaviconCache).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[FaviconCache.domain],
+        set_={
+            'favicon_url': stmt.excluded.favicon_url,
+            'checked_at': stmt.excluded.checked_at,
+            'expires_at': stmt.excluded.expires_at,
+        }
+    )
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(stmt)
+    except Exception as e:
+        logger.error(f"Error caching favicons for {len(rows)} domains: {str(e)}")
+
+def resolve_favicons(urls):
+    """
+    Return {url: favicon URL} for website URLs, None for URLs without a domain.
+    Results are looked up in process memory, then in the favicon_cache table.
+    Domains missing from both are probed concurrently, once per domain.
+    Websites without a direct favicon get Google's favicon service.
+    """
+    sites = {url: split_site(url) for url in urls}
+    now = datetime.utcnow()
+    found = _cached_favicons({site[1] for site in sites.values() if site}, now)
     
-    # Default logo for unknown services
-    default_logo = 'https://cdn-icons-png.flaticon.com/512/5053/5053352.png'
+    missing = [site for site in sites.values() if site and site[1] not in found]
+    if missing:
+        probed = _favicon_prober.probe_many(missing)
+        _store_favicons(probed, now)
+        found.update(probed)
     
-    # Check if we have a specific logo for this service
-    # Try case-insensitive match
-    service_name_lower = service_name.lower()
-    for known_service, logo in service_logos.items():
-        if known_service in service_name_lower:
-            return logo
+    return {
+        url: (found[site[1]] or google_favicon(site[1])) if site else None
+        for url, site in sites.items()
+    }
+
+def resolve_favicon(url):
+    """Return the favicon URL for a website, or None if the URL has no domain. See resolve_favicons."""
+    return resolve_favicons([url])[url]
+
+def get_logo_url_for_service(service_name, url=None):
+    """
+    Get a logo URL for a specific service based on its name or website.
+    If no match is found and URL is provided, attempt to get favicon from the website.
+    """
+    # Longest known service name in the name, then the most specific known domain
+    logo = logo_catalog.lookup(service_name, url)
+    if logo:
+        return logo
     
-    # If URL is provided, try to get favicon from website
+    # If URL is provided, use the website's favicon
     if url:
         try:
-            # Parse the URL to get the domain
-            from urllib.parse import urlparse
-            parsed_url = urlparse(url)
-            
-            # Only continue if we have a valid domain
-            if parsed_url.netloc:
-                # Try common favicon locations
-                favicon_urls = [
-                    f"{parsed_url.scheme}://{parsed_url.netloc}/favicon.ico",
-                    f"{parsed_url.scheme}://{parsed_url.netloc}/favicon.png",
-                    f"{parsed_url.scheme}://{parsed_url.netloc}/apple-touch-icon.png",
-                    f"{parsed_url.scheme}://{parsed_url.netloc}/apple-icon.png",
-                ]
-                
-                # Use Google's favicon service as a fallback
-                google_favicon = f"https://www.google.com/s2/favicons?domain={parsed_url.netloc}&sz=64"
-                
-                # Try direct favicon URLs first
-                for favicon_url in favicon_urls:
-                    try:
-                        response = requests.head(favicon_url, timeout=2)
-                        if response.status_code == 200:
-                            return favicon_url
-                    except:
-                        pass
-                
-                # Fallback to Google's favicon service
-                return google_favicon
+            favicon_url = resolve_favicon(url)
+            if favicon_url:
+                return favicon_url
         except Exception as e:
             logging.error(f"Error fetching favicon for {url}: {str(e)}")
     
-    return default_logo
+    return DEFAULT_LOGO
+
+def get_logo_urls_for_services(services):
+    """
+    Batch version of get_logo_url_for_service for (service_name, url) pairs.
+    Favicons of all websites without a known logo are resolved together.
+    Returns {(service_name, url): logo_url}.
+    """
+    logos = {}
+    for service_name, url in services:
+        logos[(service_name, url)] = logo_catalog.lookup(service_name, url)
+    
+    urls = {url for (service_name, url), logo in logos.items() if not logo and url}
+    favicons = {}
+    if urls:
+        try:
+            favicons = resolve_favicons(urls)
+        except Exception as e:
+            logging.error(f"Error fetching favicons for {len(urls)} websites: {str(e)}")
+    
+    return {
+        (service_name, url): logo or favicons.get(url) or DEFAULT_LOGO
+        for (service_name, url), logo in logos.items()
+    }
 
 def update_subscription_logos():
     """Update all subscription logo URLs based on their names."""
@@ -349,85 +757,222 @@ def update_subscription_logos():
     
     db.session.commit()
 
+def _get_image_executor():
+    global _image_executor
+    with _image_executor_lock:
+        if _image_executor is None:
+            # Workers are started by a fork server instead of forking this
+            # process, which holds database connections, locks and threads
+            _image_executor = ProcessPoolExecutor(
+                max_workers=IMAGE_WORKERS,
+                mp_context=multiprocessing.get_context('forkserver')
+            )
+        return _image_executor
+
+def stored_logo_key(logo_url):
+    """Return the StoredLogo key of an uploaded logo URL (any size), or None."""
+    if not logo_url:
+        return None
+    match = STORED_LOGO_URL.match(logo_url)
+    return match.group('key') if match else None
+
+def _retain_stored_logo(key, extension):
+    """Add a reference to a stored logo, creating it if needed. Returns the new ref_count."""
+    stmt = pg_insert(StoredLogo).values(key=key, extension=extension, ref_count=1, created_at=datetime.utcnow())
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[StoredLogo.key],
+        set_={'ref_count': StoredLogo.ref_count + 1}
+    ).returning(StoredLogo.ref_count)
+    
+    # Committed right away, so the reference holds before any file is written
+    with db.engine.begin() as connection:
+        return connection.execute(stmt).scalar()
+
+def release_logo(logo_url):
+    """
+    Drop a subscription's reference to an uploaded logo and delete its files
+    when no subscription uses it any more. Commits. Call it once the
+    subscription no longer points at logo_url; other logo URLs are ignored.
+    """
+    import os
+    from models import Subscription
+    
+    if not logo_url or not logo_url.startswith(f"/{LOGO_UPLOAD_DIR}/"):
+        return
+    
+    base_path, extension = os.path.splitext(logo_url[1:])
+    paths = logo_file_paths(base_path, extension[1:]).values()
+    key = stored_logo_key(logo_url)
+    if key is None:
+        # Uploads from before the logo store belong to one subscription
+        _remove_files(paths)
+        return
+    
+    # The row stays locked until the commit, so an upload can't take a new
+    # reference between the check below and the files being deleted. An
+    # upload waiting on the lock finds the files gone and writes them again.
+    ref_count = db.session.execute(
+        select(StoredLogo.ref_count).where(StoredLogo.key == key).with_for_update()
+    ).scalar()
+    if ref_count is not None:
+        ref_count -= 1
+        if ref_count <= 0:
+            # Logo URLs can also arrive through CSV imports without taking a
+            # reference, so the count is checked against the subscriptions
+            ref_count = db.session.execute(
+                select(func.count(Subscription.id)).where(Subscription.logo_url == logo_url)
+            ).scalar()
+        
+        if ref_count > 0:
+            db.session.execute(
+                update(StoredLogo)
+                .where(StoredLogo.key == key)
+                .values(ref_count=ref_count)
+                .execution_options(synchronize_session=False)
+            )
+        else:
+            db.session.execute(
+                delete(StoredLogo)
+                .where(StoredLogo.key == key)
+                .execution_options(synchronize_session=False)
+            )
+    
+    try:
+        # Files without a StoredLogo row are left over and can go
+        if not ref_count:
+            _remove_files(paths)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+def _remove_files(paths):
+    import os
+    
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def _finish_logo_upload(future, subscription_id, staged_path, logo_url):
+    """
+    Point a subscription at its processed logo and release the logo it replaces.
+    Runs on the logo upload thread; the app context's session is removed when it ends.
+    """
+    import os
+    
+    try:
+        paths = future.result()
+    except Exception as e:
+        logger.error(f"Error processing uploaded logo for subscription {subscription_id}: {str(e)}")
+        paths = None
+    finally:
+        if os.path.exists(staged_path):
+            os.remove(staged_path)
+    
+    with app.app_context():
+        from models import Subscription
+        
+        if paths is None:
+            # Drop the reference taken for this upload
+            release_logo(logo_url)
+            return
+        
+        try:
+            # The row stays locked until the commit, so another upload for the
+            # same subscription reads the logo set here, not the same old one
+            old_logo_url = db.session.execute(
+                select(Subscription.logo_url).where(Subscription.id == subscription_id).with_for_update()
+            ).scalar()
+            result = db.session.execute(
+                update(Subscription)
+                .where(Subscription.id == subscription_id)
+                .values(logo_url=logo_url)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error saving uploaded logo for subscription {subscription_id}: {str(e)}")
+            result = None
+        
+        # The subscription was deleted in the meantime (or the update failed),
+        # or it already had this logo: the upload's reference isn't needed
+        if result is None or result.rowcount == 0 or old_logo_url == logo_url:
+            release_logo(logo_url)
+        else:
+            release_logo(old_logo_url)
+
 def handle_image_upload(file, subscription_id):
     """
     Process image uploads for subscription logos
     - Validates file type
-    - Resizes to max 200x200 px
-    - Ensures file size is under 50KB
-    - Saves to static/uploads directory with unique name
+    - Streams the upload to a staging folder
+    - Resizes, converts to WebP in 200, 64 and 32 px and keeps each file
+      under 50KB in a worker process (see image_pipeline.py)
+    - Saves to static/uploads directory, named after the SHA-256 of the
+      upload so identical logos are stored and processed once, and sets it
+      as the subscription's logo when done, replacing the previous logo
     
-    Returns the URL path to the saved image or None if failed
+    The request doesn't wait for the image to be processed.
+    Returns True if the upload was accepted, False otherwise.
     """
     import os
-    from PIL import Image
-    from io import BytesIO
     import uuid
     
     # Validate file extension
     allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'svg'}
     if not file.filename or '.' not in file.filename:
-        return None
+        return False
         
     extension = file.filename.rsplit('.', 1)[1].lower()
     if extension not in allowed_extensions:
-        return None
+        return False
     
-    # For SVG files, just save them directly (no resizing needed)
-    if extension == 'svg':
-        # Generate unique filename
-        unique_filename = f"{subscription_id}_{uuid.uuid4().hex}.{extension}"
-        upload_path = os.path.join('static', 'uploads', unique_filename)
-        
-        # Ensure file size is under 50KB (51200 bytes)
-        file_content = file.read()
-        if len(file_content) > 51200:
-            return None
-            
-        # Save the file
-        with open(upload_path, 'wb') as f:
-            f.write(file_content)
-            
-        return f"/{upload_path}"  # Return relative URL path
+    # Copy the upload to disk in blocks rather than reading it into memory,
+    # hashing it on the way
+    folder = app.config['LOGO_UPLOAD_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    os.makedirs(LOGO_UPLOAD_DIR, exist_ok=True)
+    staged_path = os.path.join(folder, f"{uuid.uuid4().hex}.{extension}")
     
-    # For other image types, resize if needed
-    try:
-        # Read the image
-        img = Image.open(BytesIO(file.read()))
-        
-        # Resize if larger than 200x200
-        if img.width > 200 or img.height > 200:
-            img.thumbnail((200, 200))
-        
-        # Save to memory to check size
-        img_byte_arr = BytesIO()
-        img.save(img_byte_arr, format=img.format or 'PNG')
-        img_byte_arr.seek(0)
-        
-        # Check if file size is under 50KB
-        if img_byte_arr.getbuffer().nbytes > 51200:  # 50KB in bytes
-            # If too large, compress more aggressively
-            quality = 85
-            while img_byte_arr.getbuffer().nbytes > 51200 and quality > 20:
-                img_byte_arr = BytesIO()
-                img.save(img_byte_arr, format='JPEG', quality=quality, optimize=True)
-                img_byte_arr.seek(0)
-                quality -= 15
-            
-            # If still too large after compression
-            if img_byte_arr.getbuffer().nbytes > 51200:
-                return None
-        
-        # Generate unique filename
-        unique_filename = f"{subscription_id}_{uuid.uuid4().hex}.{extension}"
-        upload_path = os.path.join('static', 'uploads', unique_filename)
-        
-        # Save the file
-        with open(upload_path, 'wb') as f:
-            f.write(img_byte_arr.getvalue())
-        
-        return f"/{upload_path}"  # Return relative URL path
+    digest = hashlib.sha256()
+    size = 0
+    with open(staged_path, 'wb') as f:
+        while True:
+            block = file.stream.read(UPLOAD_BLOCK_SIZE)
+            if not block:
+                break
+            size += len(block)
+            if size > MAX_LOGO_UPLOAD_BYTES:
+                break
+            digest.update(block)
+            f.write(block)
+    
+    if size > MAX_LOGO_UPLOAD_BYTES:
+        os.remove(staged_path)
+        return False
     
+    key = digest.hexdigest()
+    stored_extension = 'svg' if extension == 'svg' else 'webp'
+    _retain_stored_logo(key, stored_extension)
+    
+    logo_url = f"/{LOGO_UPLOAD_DIR}/{key}.{stored_extension}"
+    try:
+        future = _get_image_executor().submit(
+            process_logo_image, staged_path, os.path.join(LOGO_UPLOAD_DIR, key), extension
+        )
     except Exception as e:
-        logging.error(f"Error processing uploaded image: {str(e)}")
-        return None
+        logger.error(f"Error queueing uploaded logo for subscription {subscription_id}: {str(e)}")
+        os.remove(staged_path)
+        # Drop the reference taken above in a session of its own, so the
+        # request's pending changes aren't committed along with it
+        with app.app_context():
+            release_logo(logo_url)
+        return False
+    
+    future.add_done_callback(lambda done: _logo_upload_executor.submit(
+        _finish_logo_upload, done, subscription_id, staged_path, logo_url
+    ))
+    return True